@@ -1,7 +1,5 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
-from django.core.mail import send_mail
-from django.conf import settings
 
 class UserManager(BaseUserManager):
     """Кастомный менеджер для модели User без username"""
@@ -102,7 +100,7 @@ class User(AbstractUser):
         return ', '.join(parts)
     
     def send_confirmation_email(self, request):
-        """Упрощенная отправка письма с подтверждением email"""
+        """Постановка письма с подтверждением email в очередь отправки"""
         from .tokens import email_confirmation_token
         from django.utils.http import urlsafe_base64_encode
         from django.utils.encoding import force_bytes
@@ -127,12 +125,14 @@ class User(AbstractUser):
         Команда Мастерской
         """
         
-        send_mail(
-            subject=subject,
+        # Письмо уходит через очередь уведомлений (команда deliver_notifications)
+        from notifications.models import Notification
+        Notification.objects.create(
+            user=self,
+            notification_type='email_confirmation',
+            title=subject,
             message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[self.email],
-            fail_silently=False,
+            deliver_by_email=True,
         )
         
         print("\n" + "="*60)
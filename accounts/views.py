@@ -16,6 +16,8 @@ from .forms import CustomAuthenticationForm
 from django.db.models import Q
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from products.models import Product, Category
+from analytics.events import track
+from analytics.utils import ProductRankingManager
 # ============================================================================
 # ГЛАВНАЯ СТРАНИЦА
 # ============================================================================
@@ -23,7 +25,7 @@ from products.models import Product, Category
 def home_view(request):
     """Главная страница мастерской"""
     # Получаем все активные товары
-    products = Product.objects.filter(status='active').order_by('-created_at')
+    products = Product.objects.filter(status='active').with_rating().order_by('-created_at')
 
     # Поиск по названию и описанию
     search_query = request.GET.get('search', '')
@@ -32,6 +34,7 @@ def home_view(request):
             Q(name__icontains=search_query) |
             Q(description__icontains=search_query)
         )
+        track('search', request, query=search_query)
 
     # Фильтр по категории
     category_id = request.GET.get('category')
@@ -76,11 +79,20 @@ def home_view(request):
         technique__isnull=True
     ).exclude(technique='').values_list('technique', flat=True).distinct()
 
+    # Блоки рейтингов — только на первой странице без поиска и фильтров
+    bestsellers = trending = []
+    if products_page.number == 1 and not (search_query or technique or min_price or max_price):
+        bestsellers = ProductRankingManager.top('bestsellers', category_id=category_id, limit=4)
+        if not category_id:
+            trending = ProductRankingManager.top('trending', limit=4)
+
     context = {
         'products': products_page,
         'categories': categories,
         'techniques': techniques,
         'search_query': search_query,
+        'bestsellers': bestsellers,
+        'trending': trending,
     }
 
     return render(request, 'home.html', context)
@@ -298,6 +310,17 @@ def master_dashboard(request):
         # Список заказов для отображения (если нужен)
         recent_orders = orders.order_by('-created_at')[:5]
         
+        # Доходность товаров за последний рассчитанный период
+        from analytics.models import ProductProfitability
+        latest_period = ProductProfitability.objects.filter(
+            master=request.user
+        ).order_by('-period_start').values('period_start', 'period_end').first()
+        profitability = []
+        if latest_period:
+            profitability = ProductProfitability.objects.filter(
+                master=request.user, **latest_period
+            ).select_related('product').order_by('-margin')[:10]
+        
     except Exception as e:
         print(f"Ошибка при получении статистики: {e}")
         # Значения по умолчанию
@@ -309,6 +332,8 @@ def master_dashboard(request):
         materials_count = 0
         reviews_count = 0
         recent_orders = []
+        latest_period = None
+        profitability = []
     
     context = {
         'title': 'Панель мастера',
@@ -320,6 +345,8 @@ def master_dashboard(request):
         'reviews_count': reviews_count,
         'products': products[:5],  # Последние 5 товаров
         'recent_orders': recent_orders,
+        'profitability_period': latest_period,
+        'profitability': profitability,
     }
     return render(request, 'accounts/master_dashboard.html', context)
 
@@ -341,11 +368,17 @@ def master_detail(request, user_id):
     return render(request, 'accounts/master_detail.html', context)
 
 def master_list(request):
-    """Список всех мастеров"""
-    masters = User.objects.filter(role='master').order_by('-date_joined')
+    """Список всех мастеров (?sort=rating — сначала лучшие по рейтингу)"""
+    sort = request.GET.get('sort', '')
+    masters = User.objects.filter(role='master')
+    if sort == 'rating':
+        masters = masters.order_by('-master_rating', '-date_joined')
+    else:
+        masters = masters.order_by('-date_joined')
     
     context = {
         'masters': masters,
+        'sort': sort,
         'title': 'Наши мастера'
     }
     return render(request, 'accounts/master_list.html', context)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import DailyStat, MasterStat
+from .models import DailyStat, MasterStat, ProductPopularity, ProductProfitability
 from accounts.models import User
 
 @admin.register(DailyStat)
@@ -19,6 +19,9 @@ class DailyStatAdmin(admin.ModelAdmin):
         ('Конверсия', {
             'fields': ('cart_abandonment_rate', 'revenue_per_order')
         }),
+        ('Поведение', {
+            'fields': ('product_views', 'searches', 'cart_additions', 'cart_views', 'checkouts')
+        }),
         ('Даты', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -75,4 +78,49 @@ class MasterStatAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if not request.user.is_superuser and request.user.role == 'master':
             return qs.filter(master=request.user)
-        return qs
\ No newline at end of file
+        return qs
+
+@admin.register(ProductPopularity)
+class ProductPopularityAdmin(admin.ModelAdmin):
+    list_display = ('product', 'views', 'cart_additions', 'conversion_rate', 'updated_at')
+    search_fields = ('product__name',)
+    list_select_related = ('product',)
+    ordering = ('-views',)
+    readonly_fields = ('product', 'views', 'cart_additions', 'updated_at')
+    
+    def conversion_rate(self, obj):
+        return f"{obj.conversion_rate():.1f}%"
+    conversion_rate.short_description = 'Конверсия в корзину'
+    
+    def has_add_permission(self, request):
+        """Счётчики обновляются только из журнала событий"""
+        return False
+
+
+@admin.register(ProductProfitability)
+class ProductProfitabilityAdmin(admin.ModelAdmin):
+    """Отчёт о доходности товаров"""
+    list_display = ('product', 'master', 'period_start', 'period_end', 'units_sold',
+                    'revenue', 'material_cost', 'margin', 'margin_percent_display')
+    list_filter = ('period_start', 'period_end', 'master')
+    search_fields = ('product__name', 'master__email')
+    list_select_related = ('product', 'master')
+    ordering = ('-period_start', '-margin')
+    readonly_fields = ('product', 'master', 'period_start', 'period_end', 'units_sold', 'revenue',
+                       'material_cost', 'margin', 'margin_percent', 'computed_at')
+    
+    def margin_percent_display(self, obj):
+        color = 'green' if obj.margin_percent >= 0 else 'red'
+        return format_html('<span style="color: {};">{}%</span>', color, obj.margin_percent)
+    margin_percent_display.short_description = 'Маржа, %'
+    margin_percent_display.admin_order_field = 'margin_percent'
+    
+    def has_add_permission(self, request):
+        """Отчёт формируется командой compute_profitability"""
+        return False
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if not request.user.is_superuser and request.user.role == 'master':
+            return qs.filter(master=request.user)
+        return qs
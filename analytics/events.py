@@ -0,0 +1,171 @@
+# analytics/events.py
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicFlush:
+    """Фоновый поток, который сбрасывает буфер раз в ANALYTICS_EVENT_FLUSH_INTERVAL.
+    
+    Без него пачка пишется только при следующей записи в буфер, и в тихие
+    периоды события попадали бы в БД уже после того, как свёртка сдвинула
+    отметку по created_at за их время. Поток запускается при первой записи
+    в каждом процессе (после fork потоки родителя не наследуются).
+    """
+    
+    _timer_pid = None
+    
+    def _ensure_timer(self):
+        pid = os.getpid()
+        if self._timer_pid != pid:
+            self._timer_pid = pid
+            threading.Thread(target=self._tick, daemon=True).start()
+    
+    def _tick(self):
+        while True:
+            time.sleep(settings.ANALYTICS_EVENT_FLUSH_INTERVAL)
+            self.flush(close_connection=True)
+
+
+class EventCollector(PeriodicFlush):
+    """Буфер событий в памяти процесса.
+    
+    record() только добавляет запись в список. Когда набирается
+    ANALYTICS_EVENT_BUFFER_SIZE событий или проходит ANALYTICS_EVENT_FLUSH_INTERVAL
+    секунд, пачка записывается одним bulk_create в фоновом потоке,
+    так что запрос посетителя записи в БД не ждёт.
+    """
+    
+    def __init__(self):
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+    
+    def record(self, event_type, request=None, product_id=None, query=''):
+        from .models import Event
+        
+        user = getattr(request, 'user', None)
+        event = Event(
+            event_type=event_type,
+            user_id=user.pk if user is not None and user.is_authenticated else None,
+            product_id=product_id,
+            query=query[:200],
+            created_at=timezone.now(),
+        )
+        
+        with self.lock:
+            self._ensure_timer()
+            self.buffer.append(event)
+            due = (
+                len(self.buffer) >= settings.ANALYTICS_EVENT_BUFFER_SIZE
+                or time.monotonic() - self.last_flush >= settings.ANALYTICS_EVENT_FLUSH_INTERVAL
+            )
+            batch = self._take() if due else None
+        
+        if batch:
+            threading.Thread(target=self._write, args=(batch,), daemon=True).start()
+    
+    def flush(self, close_connection=False):
+        """Синхронная запись накопленного (по таймеру, при остановке процесса и в командах)"""
+        with self.lock:
+            batch = self._take()
+        if batch:
+            self._write(batch, close_connection=close_connection)
+        return len(batch)
+    
+    def _take(self):
+        batch, self.buffer = self.buffer, []
+        self.last_flush = time.monotonic()
+        return batch
+    
+    @staticmethod
+    def _write(batch, close_connection=True):
+        from .models import Event
+        
+        try:
+            Event.objects.bulk_create(batch, batch_size=1000)
+        except Exception:
+            # Потеря пачки статистики не должна ронять процесс
+            logger.exception('Не удалось записать %s событий аналитики', len(batch))
+        finally:
+            if close_connection:
+                # У фонового потока своё соединение — не оставляем его открытым
+                connection.close()
+
+
+class ActiveUserBuffer(PeriodicFlush):
+    """Накопление id активных пользователей по дням перед записью в скетчи.
+    
+    Повторные запросы одного пользователя за день схлопываются во множестве,
+    а скетч дня обновляется одной транзакцией на пачку. Пороги те же, что
+    у журнала событий.
+    """
+    
+    def __init__(self):
+        self.days = {}
+        self.size = 0
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+    
+    def add(self, user_id):
+        day = timezone.localdate()
+        with self.lock:
+            self._ensure_timer()
+            users = self.days.setdefault(day, set())
+            if user_id in users:
+                return
+            users.add(user_id)
+            self.size += 1
+            due = (
+                self.size >= settings.ANALYTICS_EVENT_BUFFER_SIZE
+                or time.monotonic() - self.last_flush >= settings.ANALYTICS_EVENT_FLUSH_INTERVAL
+            )
+            batch = self._take() if due else None
+        
+        if batch:
+            threading.Thread(target=self._write, args=(batch,), daemon=True).start()
+    
+    def flush(self, close_connection=False):
+        with self.lock:
+            batch = self._take()
+        if batch:
+            self._write(batch, close_connection=close_connection)
+        return sum(len(users) for users in batch.values())
+    
+    def _take(self):
+        batch, self.days, self.size = self.days, {}, 0
+        self.last_flush = time.monotonic()
+        return batch
+    
+    @staticmethod
+    def _write(batch, close_connection=True):
+        from .models import ActiveUserSketch
+        
+        try:
+            for day, user_ids in batch.items():
+                ActiveUserSketch.add_users(day, user_ids)
+        except Exception:
+            logger.exception('Не удалось обновить скетч активных пользователей')
+        finally:
+            if close_connection:
+                connection.close()
+
+
+collector = EventCollector()
+atexit.register(collector.flush)
+
+active_users = ActiveUserBuffer()
+atexit.register(active_users.flush)
+
+
+def track(event_type, request=None, product_id=None, query=''):
+    """Регистрация события аналитики"""
+    collector.record(event_type, request=request, product_id=product_id, query=query)
@@ -0,0 +1,78 @@
+# analytics/hll.py
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """Оценка числа уникальных значений в массиве фиксированного размера.
+    
+    P = 12 бит индекса: 4096 однобайтовых регистров (4 КБ на скетч).
+    Стандартная ошибка 1.04 / sqrt(4096) ≈ 1.6%: примерно в 95% случаев
+    оценка отличается от точного значения не больше чем на 3.3%. Для малых
+    множеств используется линейный подсчёт, там оценка почти точная.
+    Скетчи объединяются поэлементным максимумом регистров, поэтому число
+    уникальных за неделю или месяц получается из дневных скетчей без
+    обращения к исходным данным.
+    """
+    
+    P = 12
+    M = 1 << P
+    ALPHA = 0.7213 / (1 + 1.079 / M)
+    STD_ERROR = 1.04 / math.sqrt(M)
+    
+    _HASH_BITS = 64
+    _REST_BITS = _HASH_BITS - P
+    _POWERS = [2.0 ** -rank for rank in range(_REST_BITS + 2)]
+    
+    def __init__(self, registers=None):
+        if registers is None:
+            self.registers = bytearray(self.M)
+        else:
+            self.registers = bytearray(registers)
+            if len(self.registers) != self.M:
+                raise ValueError(f'Ожидается {self.M} регистров, получено {len(self.registers)}')
+    
+    @staticmethod
+    def _hash(value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+    
+    def add(self, value):
+        x = self._hash(value)
+        index = x >> self._REST_BITS
+        rest = x & ((1 << self._REST_BITS) - 1)
+        # Позиция первой единицы в оставшихся битах
+        rank = self._REST_BITS - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def update(self, values):
+        for value in values:
+            self.add(value)
+    
+    def merge(self, other):
+        """Объединение с другим скетчем (на месте)"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+    
+    @classmethod
+    def union(cls, sketches):
+        """Объединение многих скетчей за один проход по регистрам"""
+        registers = [sketch.registers for sketch in sketches]
+        if not registers:
+            return cls()
+        return cls(bytearray(map(max, *registers)) if len(registers) > 1 else registers[0])
+    
+    def count(self):
+        powers = self._POWERS
+        estimate = self.ALPHA * self.M * self.M / sum(powers[rank] for rank in self.registers)
+        
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.M and zeros:
+            # Линейный подсчёт для малых множеств
+            estimate = self.M * math.log(self.M / zeros)
+        return round(estimate)
+    
+    def to_bytes(self):
+        return bytes(self.registers)
+
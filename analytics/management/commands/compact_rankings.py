@@ -0,0 +1,17 @@
+# analytics/management/commands/compact_rankings.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.utils import ProductRankingManager
+
+
+class Command(BaseCommand):
+    help = 'Ночной пересчёт рейтингов «Бестселлеры» и «В тренде» с переносом эпохи затухания'
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = ProductRankingManager.compact()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги пересчитаны: товаров {count} за {time.monotonic() - started:.1f} с'
+        ))
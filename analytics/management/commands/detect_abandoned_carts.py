@@ -0,0 +1,28 @@
+# analytics/management/commands/detect_abandoned_carts.py
+from django.core.management.base import BaseCommand
+
+from analytics.utils import AbandonedCartDetector
+
+
+class Command(BaseCommand):
+    help = 'Поиск брошенных корзин и расчёт процента брошенных корзин по дням'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Через сколько часов без заказа корзина считается брошенной')
+        parser.add_argument('--send-reminders', action='store_true',
+                            help='Создать напоминания владельцам брошенных корзин')
+    
+    def handle(self, *args, **options):
+        result = AbandonedCartDetector.run(
+            hours=options['hours'],
+            send_reminders=options['send_reminders'],
+        )
+        
+        self.stdout.write(f"Корзин с заказом: {result['converted']}")
+        self.stdout.write(f"Брошенных корзин: {result['abandoned']}")
+        for day, rate in sorted(result['days'].items()):
+            self.stdout.write(f"  {day}: {rate}%")
+        if options['send_reminders']:
+            self.stdout.write(f"Создано напоминаний: {result['reminders']}")
+        self.stdout.write(self.style.SUCCESS('Готово'))
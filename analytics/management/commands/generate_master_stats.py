@@ -0,0 +1,37 @@
+# analytics/management/commands/generate_master_stats.py
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.utils import MasterStatGenerator
+
+
+class Command(BaseCommand):
+    help = 'Расчёт статистики всех мастеров за период (по умолчанию — за прошлый месяц)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Начало периода ГГГГ-ММ-ДД')
+        parser.add_argument('--end', help='Конец периода ГГГГ-ММ-ДД (включительно)')
+    
+    def handle(self, *args, **options):
+        if options['start'] or options['end']:
+            if not (options['start'] and options['end']):
+                raise CommandError('Укажите и --start, и --end')
+            try:
+                start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+                end = datetime.strptime(options['end'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Даты задаются в формате ГГГГ-ММ-ДД')
+            if end < start:
+                raise CommandError('Конец периода раньше начала')
+        else:
+            end = timezone.localdate().replace(day=1) - timedelta(days=1)
+            start = end.replace(day=1)
+        
+        started = time.monotonic()
+        count = MasterStatGenerator.generate(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f'Статистика за {start} — {end}: мастеров {count}, за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,95 @@
+# analytics/management/commands/rollup_daily_stats.py
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from analytics.models import ProcessingWatermark
+from analytics.utils import DailyStatRollup
+
+
+def _init_worker():
+    """Каждому процессу — собственные соединения с БД, унаследованные закрываются"""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _recompute_chunk(start, end, until):
+    try:
+        return DailyStatRollup.recompute(start, end, until=until)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Расчёт дневной статистики: пересчёт периода в несколько процессов или инкрементальное обновление'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Начало периода ГГГГ-ММ-ДД')
+        parser.add_argument('--end', help='Конец периода ГГГГ-ММ-ДД (по умолчанию сегодня)')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Добавить только строки, созданные после прошлой отметки')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Число процессов для пересчёта (по умолчанию 4)')
+        parser.add_argument('--chunk-days', type=int, default=7,
+                            help='Дней в одной задаче процесса (по умолчанию 7)')
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        
+        if options['incremental']:
+            days = DailyStatRollup.incremental()
+            self.stdout.write(f"Обновлено дней: {len(days)}")
+            for day in days:
+                self.stdout.write(f"  {day}")
+            self.stdout.write(self.style.SUCCESS(f'Готово за {time.monotonic() - started:.1f} с'))
+            return
+        
+        if not options['start']:
+            raise CommandError('Укажите --start или --incremental')
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            end = (datetime.strptime(options['end'], '%Y-%m-%d').date()
+                   if options['end'] else timezone.localdate())
+        except ValueError:
+            raise CommandError('Даты задаются в формате ГГГГ-ММ-ДД')
+        if end < start:
+            raise CommandError('Конец периода раньше начала')
+        
+        # Строки после отметки — забота инкрементального режима, иначе они учтутся дважды
+        until = ProcessingWatermark.get_value(DailyStatRollup.WATERMARK)
+        set_watermark = until is None
+        if set_watermark:
+            until = timezone.now() - DailyStatRollup.LAG
+        
+        chunks = []
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), end)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+        
+        # Дочерние процессы не должны использовать соединение родителя
+        connections.close_all()
+        
+        days = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(_recompute_chunk, chunk_start, chunk_end, until): (chunk_start, chunk_end)
+                for chunk_start, chunk_end in chunks
+            }
+            for future in as_completed(futures):
+                chunk_start, chunk_end = futures[future]
+                days += future.result()
+                self.stdout.write(f"  {chunk_start} — {chunk_end}: готово")
+        
+        if set_watermark:
+            ProcessingWatermark.set_value(DailyStatRollup.WATERMARK, until)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано дней: {days} за {time.monotonic() - started:.1f} с'
+        ))
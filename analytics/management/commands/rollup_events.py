@@ -0,0 +1,18 @@
+# analytics/management/commands/rollup_events.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.utils import EventRollup
+
+
+class Command(BaseCommand):
+    help = 'Перенос новых событий журнала в дневную статистику и счётчики популярности товаров'
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = EventRollup.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Обновлено дней: {result['days']}, товаров: {result['products']} "
+            f"за {time.monotonic() - started:.1f} с"
+        ))
@@ -0,0 +1,17 @@
+from .events import active_users
+
+
+class ActiveUserMiddleware:
+    """Учёт авторизованных посетителей в дневном скетче HyperLogLog"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            active_users.add(user.pk)
+        
+        return response
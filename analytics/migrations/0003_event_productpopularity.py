@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-18 22:35
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_processingwatermark'),
+        ('products', '0002_product_base_cost_product_can_be_customized_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='products.product')),
+                ('views', models.IntegerField(default=0, verbose_name='Просмотров')),
+                ('cart_additions', models.IntegerField(default=0, verbose_name='Добавлений в корзину')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Популярность товара',
+                'verbose_name_plural': 'Популярность товаров',
+            },
+        ),
+        migrations.AddField(
+            model_name='dailystat',
+            name='cart_additions',
+            field=models.IntegerField(default=0, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.AddField(
+            model_name='dailystat',
+            name='cart_views',
+            field=models.IntegerField(default=0, verbose_name='Просмотров корзины'),
+        ),
+        migrations.AddField(
+            model_name='dailystat',
+            name='checkouts',
+            field=models.IntegerField(default=0, verbose_name='Оформлений заказа'),
+        ),
+        migrations.AddField(
+            model_name='dailystat',
+            name='product_views',
+            field=models.IntegerField(default=0, verbose_name='Просмотров товаров'),
+        ),
+        migrations.AddField(
+            model_name='dailystat',
+            name='searches',
+            field=models.IntegerField(default=0, verbose_name='Поисковых запросов'),
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('product_view', 'Просмотр товара'), ('search', 'Поиск'), ('cart_add', 'Добавление в корзину'), ('cart_view', 'Просмотр корзины'), ('checkout', 'Оформление заказа')], max_length=20, verbose_name='Событие')),
+                ('query', models.CharField(blank=True, max_length=200, verbose_name='Поисковый запрос')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время события')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'indexes': [django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='analytics_e_created_d036a5_brin')],
+            },
+        ),
+    ]
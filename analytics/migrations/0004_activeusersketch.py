@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_event_productpopularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiveUserSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('registers', models.BinaryField(verbose_name='Регистры HyperLogLog')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Скетч активных пользователей',
+                'verbose_name_plural': 'Скетчи активных пользователей',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 22:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_activeusersketch'),
+        ('products', '0002_product_base_cost_product_can_be_customized_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+                ('items_sold', models.IntegerField(default=0, verbose_name='Товаров продано')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='products.category')),
+            ],
+            options={
+                'verbose_name': 'Продажи категории за день',
+                'verbose_name_plural': 'Продажи категорий по дням',
+                'unique_together': {('date', 'category')},
+            },
+        ),
+    ]
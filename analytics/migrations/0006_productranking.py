@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 22:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_categorydailystat'),
+        ('products', '0002_product_base_cost_product_can_be_customized_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='products.product')),
+                ('total_sold', models.IntegerField(default=0, verbose_name='Продано всего')),
+                ('trending_score', models.FloatField(default=0, verbose_name='Оценка популярности')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.category')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг товара',
+                'verbose_name_plural': 'Рейтинги товаров',
+                'indexes': [models.Index(fields=['-total_sold'], name='analytics_p_total_s_3b7e75_idx'), models.Index(fields=['-trending_score'], name='analytics_p_trendin_bec496_idx'), models.Index(fields=['category', '-total_sold'], name='analytics_p_categor_c3174b_idx'), models.Index(fields=['category', '-trending_score'], name='analytics_p_categor_a0c81e_idx')],
+            },
+        ),
+    ]
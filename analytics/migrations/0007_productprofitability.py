@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 22:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_productranking'),
+        ('products', '0002_product_base_cost_product_can_be_customized_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductProfitability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='Начало периода')),
+                ('period_end', models.DateField(verbose_name='Конец периода')),
+                ('units_sold', models.IntegerField(default=0, verbose_name='Продано штук')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+                ('material_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Стоимость материалов')),
+                ('margin', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Маржа')),
+                ('margin_percent', models.DecimalField(decimal_places=2, default=0, max_digits=7, verbose_name='Маржа, %')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Рассчитано')),
+                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_profitability', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profitability', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Доходность товара',
+                'verbose_name_plural': 'Доходность товаров',
+                'indexes': [models.Index(fields=['master', 'period_start', '-margin'], name='analytics_p_master__e8f42a_idx')],
+                'unique_together': {('product', 'period_start', 'period_end')},
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models, transaction
 from django.utils import timezone
 from accounts.models import User
+from products.models import Category, Product
 
 class DailyStat(models.Model):
     date = models.DateField('Дата', unique=True)
@@ -18,6 +20,13 @@ class DailyStat(models.Model):
     cart_abandonment_rate = models.DecimalField('Процент брошенных корзин', 
                                                max_digits=5, decimal_places=2, default=0)
     
+    # Поведение (из журнала событий)
+    product_views = models.IntegerField('Просмотров товаров', default=0)
+    searches = models.IntegerField('Поисковых запросов', default=0)
+    cart_additions = models.IntegerField('Добавлений в корзину', default=0)
+    cart_views = models.IntegerField('Просмотров корзины', default=0)
+    checkouts = models.IntegerField('Оформлений заказа', default=0)
+    
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
     
@@ -31,15 +40,28 @@ class DailyStat(models.Model):
     
     @classmethod
     def update_today_stats(cls):
-        """Обновление статистики за сегодня"""
-        today = timezone.now().date()
-        stat, created = cls.objects.get_or_create(date=today)
+        """Обновление статистики за сегодня (инкрементально, с прошлой отметки)"""
+        from .utils import DailyStatRollup
         
-        # Здесь будет логика обновления статистики
-        # Пока просто сохраняем
-        stat.save()
+        DailyStatRollup.incremental()
+        stat, created = cls.objects.get_or_create(date=timezone.localdate())
         return stat
 
+class CategoryDailyStat(models.Model):
+    """Продажи категории за день (для панели аналитики)"""
+    date = models.DateField('Дата')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_stats')
+    revenue = models.DecimalField('Выручка', max_digits=12, decimal_places=2, default=0)
+    items_sold = models.IntegerField('Товаров продано', default=0)
+    
+    class Meta:
+        verbose_name = 'Продажи категории за день'
+        verbose_name_plural = 'Продажи категорий по дням'
+        unique_together = ['date', 'category']
+    
+    def __str__(self):
+        return f"{self.category.name} за {self.date}"
+
 class MasterStat(models.Model):
     master = models.ForeignKey(User, on_delete=models.CASCADE, 
                               limit_choices_to={'role': 'master'},
@@ -78,4 +100,184 @@ class MasterStat(models.Model):
         """Расчет маржинальности"""
         if self.revenue > 0:
             return ((self.revenue - self.materials_cost) / self.revenue) * 100
-        return 0
\ No newline at end of file
+        return 0
+
+class ProcessingWatermark(models.Model):
+    """Отметка, до которой данные уже обработаны инкрементальной задачей"""
+    name = models.CharField('Задача', max_length=100, unique=True)
+    value = models.DateTimeField('Обработано до', null=True, blank=True)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Отметка обработки'
+        verbose_name_plural = 'Отметки обработки'
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+    
+    @classmethod
+    def get_value(cls, name):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first()
+    
+    @classmethod
+    def set_value(cls, name, value):
+        cls.objects.update_or_create(name=name, defaults={'value': value})
+
+
+class Event(models.Model):
+    """Журнал действий посетителей (только добавление записей)"""
+    EVENT_CHOICES = [
+        ('product_view', 'Просмотр товара'),
+        ('search', 'Поиск'),
+        ('cart_add', 'Добавление в корзину'),
+        ('cart_view', 'Просмотр корзины'),
+        ('checkout', 'Оформление заказа'),
+    ]
+    
+    event_type = models.CharField('Событие', max_length=20, choices=EVENT_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+    query = models.CharField('Поисковый запрос', max_length=200, blank=True)
+    created_at = models.DateTimeField('Время события', default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+        indexes = [
+            # Записи идут по времени: BRIN-индекс крошечный и достаточен для выборки диапазона
+            BrinIndex(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_event_type_display()} {self.created_at:%d.%m.%Y %H:%M}"
+
+class ProductPopularity(models.Model):
+    """Накопительные счётчики интереса к товару (обновляются из журнала событий)"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='popularity')
+    views = models.IntegerField('Просмотров', default=0)
+    cart_additions = models.IntegerField('Добавлений в корзину', default=0)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Популярность товара'
+        verbose_name_plural = 'Популярность товаров'
+    
+    def __str__(self):
+        return f"{self.product.name}: {self.views} просмотров"
+    
+    def conversion_rate(self):
+        """Доля просмотров, закончившихся добавлением в корзину (%)"""
+        if self.views > 0:
+            return self.cart_additions * 100 / self.views
+        return 0
+
+
+class ActiveUserSketch(models.Model):
+    """Скетч HyperLogLog уникальных авторизованных посетителей за день"""
+    date = models.DateField('Дата', unique=True)
+    registers = models.BinaryField('Регистры HyperLogLog')
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Скетч активных пользователей'
+        verbose_name_plural = 'Скетчи активных пользователей'
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"Активные пользователи за {self.date}"
+    
+    def sketch(self):
+        from .hll import HyperLogLog
+        return HyperLogLog(self.registers)
+    
+    @classmethod
+    def add_users(cls, day, user_ids):
+        """Добавление пользователей в скетч дня (строка блокируется на время слияния)"""
+        from .hll import HyperLogLog
+        
+        with transaction.atomic():
+            stored, created = cls.objects.select_for_update().get_or_create(
+                date=day, defaults={'registers': bytes(HyperLogLog.M)}
+            )
+            sketch = stored.sketch()
+            sketch.update(user_ids)
+            stored.registers = sketch.to_bytes()
+            stored.save(update_fields=['registers', 'updated_at'])
+    
+    @classmethod
+    def counts_by_day(cls, start_date, end_date):
+        """{дата: оценка числа уникальных} для дней, по которым есть скетчи"""
+        return {
+            stored.date: stored.sketch().count()
+            for stored in cls.objects.filter(date__range=(start_date, end_date))
+        }
+    
+    @classmethod
+    def count_range(cls, start_date, end_date):
+        """Уникальные пользователи за произвольный период (неделя, месяц) объединением скетчей"""
+        from .hll import HyperLogLog
+        
+        registers = cls.objects.filter(
+            date__range=(start_date, end_date)
+        ).values_list('registers', flat=True)
+        return HyperLogLog.union(HyperLogLog(value) for value in registers).count()
+
+
+class ProductRanking(models.Model):
+    """Рейтинги товаров для блоков «Бестселлеры» и «В тренде».
+    
+    trending_score хранится как сумма quantity * exp(λ·(t − t0)) от эпохи t0
+    (ProcessingWatermark «trending_epoch»): порядок по хранимому значению
+    совпадает с порядком по затухающей оценке, поэтому старые строки
+    не нужно пересчитывать при каждой продаже.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='ranking')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='+')
+    total_sold = models.IntegerField('Продано всего', default=0)
+    trending_score = models.FloatField('Оценка популярности', default=0)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Рейтинг товара'
+        verbose_name_plural = 'Рейтинги товаров'
+        indexes = [
+            models.Index(fields=['-total_sold']),
+            models.Index(fields=['-trending_score']),
+            models.Index(fields=['category', '-total_sold']),
+            models.Index(fields=['category', '-trending_score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name}: продано {self.total_sold}"
+
+
+class ProductProfitability(models.Model):
+    """Доходность товара за период с учётом стоимости материалов"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='profitability')
+    master = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_profitability')
+    period_start = models.DateField('Начало периода')
+    period_end = models.DateField('Конец периода')
+    
+    units_sold = models.IntegerField('Продано штук', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=12, decimal_places=2, default=0)
+    material_cost = models.DecimalField('Стоимость материалов', max_digits=12, decimal_places=2, default=0)
+    margin = models.DecimalField('Маржа', max_digits=12, decimal_places=2, default=0)
+    margin_percent = models.DecimalField('Маржа, %', max_digits=7, decimal_places=2, default=0)
+    
+    computed_at = models.DateTimeField('Рассчитано', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Доходность товара'
+        verbose_name_plural = 'Доходность товаров'
+        unique_together = ['product', 'period_start', 'period_end']
+        indexes = [
+            models.Index(fields=['master', 'period_start', '-margin']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name} за {self.period_start} - {self.period_end}"
@@ -0,0 +1,925 @@
+# analytics/utils.py
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CategoryDailyStat, DailyStat, Event, MasterStat, ProcessingWatermark, ProductPopularity,
+    ProductProfitability, ProductRanking,
+)
+
+
+class AbandonedCartDetector:
+    """Классификация брошенных корзин и расчёт DailyStat.cart_abandonment_rate.
+    
+    Корзина считается брошенной, если в ней есть товары, а заказа от того же
+    пользователя не было в течение N часов после последнего изменения корзины.
+    Каждый запуск просматривает только корзины, изменённые после прошлой отметки.
+    """
+    
+    WATERMARK = 'abandoned_carts'
+    
+    @staticmethod
+    def run(hours=24, send_reminders=False):
+        from cart.models import Cart, CartItem
+        from orders.models import Order
+        
+        # Корзины младше N часов ещё могут превратиться в заказ
+        mature_before = timezone.now() - timedelta(hours=hours)
+        since = ProcessingWatermark.get_value(AbandonedCartDetector.WATERMARK)
+        
+        carts = Cart.objects.filter(updated_at__lte=mature_before)
+        if since:
+            carts = carts.filter(updated_at__gt=since)
+        
+        has_order = Exists(Order.objects.filter(
+            user=OuterRef('user'),
+            created_at__gte=OuterRef('updated_at'),
+            created_at__lte=OuterRef('updated_at') + timedelta(hours=hours),
+        ))
+        has_items = Exists(CartItem.objects.filter(cart=OuterRef('pk')))
+        
+        days = list(
+            carts.annotate(day=TruncDate('updated_at')).values_list('day', flat=True).distinct()
+        )
+        
+        converted = carts.filter(has_order).update(is_abandoned=False)
+        abandoned_carts = list(
+            carts.filter(~has_order, has_items).values_list('pk', 'user_id')
+        )
+        Cart.objects.filter(pk__in=[pk for pk, _ in abandoned_carts]).update(is_abandoned=True)
+        
+        rates = AbandonedCartDetector.update_daily_rates(days)
+        
+        reminders = 0
+        if send_reminders and abandoned_carts:
+            reminders = AbandonedCartDetector.enqueue_reminders(
+                {user_id for _, user_id in abandoned_carts}
+            )
+        
+        ProcessingWatermark.set_value(AbandonedCartDetector.WATERMARK, mature_before)
+        
+        return {
+            'converted': converted,
+            'abandoned': len(abandoned_carts),
+            'days': rates,
+            'reminders': reminders,
+        }
+    
+    @staticmethod
+    def update_daily_rates(days):
+        """Пересчёт процента брошенных корзин за указанные дни одним запросом"""
+        from cart.models import Cart
+        
+        if not days:
+            return {}
+        
+        stats = (
+            Cart.objects.filter(is_abandoned__isnull=False)
+            .annotate(day=TruncDate('updated_at'))
+            .filter(day__in=days)
+            .values('day')
+            .annotate(total=Count('id'), abandoned=Count('id', filter=Q(is_abandoned=True)))
+        )
+        rates = {
+            row['day']: (Decimal(row['abandoned'] * 100) / row['total']).quantize(Decimal('0.01'))
+            for row in stats
+        }
+        
+        DailyStat.objects.bulk_create(
+            [DailyStat(date=day, cart_abandonment_rate=rate) for day, rate in rates.items()],
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['cart_abandonment_rate', 'updated_at'],
+        )
+        return rates
+    
+    @staticmethod
+    def enqueue_reminders(user_ids):
+        """Напоминания о брошенной корзине одной пакетной вставкой"""
+        from notifications.models import Notification
+        
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                notification_type='cart_reminder',
+                title='Вы оставили товары в корзине',
+                message='Товары всё ещё ждут вас в корзине. Оформите заказ, пока они в наличии!',
+                related_object_type='cart',
+            )
+            for user_id in user_ids
+        ])
+        # bulk_create не вызывает сигналы — сдвигаем счётчики непрочитанных сами
+        for notification in notifications:
+            Notification.adjust_unread(notification.user_id, 1)
+        return len(notifications)
+
+
+class DailyStatRollup:
+    """Расчёт DailyStat: заказы, выручка, проданные товары, новые и активные пользователи.
+    
+    Полный пересчёт дня (recompute) записывает абсолютные значения и безопасен
+    при повторном запуске. Инкрементальный режим (incremental) прибавляет
+    только строки, созданные после отметки ProcessingWatermark.
+    """
+    
+    WATERMARK = 'daily_stats'
+    # Запас на транзакции, которые ещё не успели зафиксироваться
+    LAG = timedelta(minutes=5)
+    COUNTERS = ('total_orders', 'total_revenue', 'total_items_sold', 'new_users')
+    
+    @staticmethod
+    def day_bounds(start_date, end_date):
+        """Границы периода [начало start_date, начало дня после end_date) в текущей зоне"""
+        return (
+            timezone.make_aware(datetime.combine(start_date, time.min)),
+            timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+        )
+    
+    @staticmethod
+    def _empty():
+        return {'total_orders': 0, 'total_revenue': Decimal('0'), 'total_items_sold': 0, 'new_users': 0}
+    
+    @staticmethod
+    def cancelled_as_of(history_model, as_of, order_ref='pk', status_field='status'):
+        """Условие «заказ отменён на момент as_of» по истории статусов.
+        
+        Текущий статус для этого не годится: заказ, отменённый уже после
+        отметки, инкрементальный режим вычтет сам, и пересчёт не должен
+        исключать его заранее. Отмена без записи в истории учитывается по статусу.
+        """
+        cancellations = history_model.objects.filter(order=OuterRef(order_ref), status='cancelled')
+        return (
+            Exists(cancellations.filter(changed_at__lte=as_of))
+            | Q(**{status_field: 'cancelled'}) & ~Exists(cancellations)
+        )
+    
+    @staticmethod
+    def aggregate(created_from, created_to, as_of=None):
+        """Счётчики по дням для строк, созданных в (created_from, created_to].
+        
+        По одному сгруппированному запросу на заказы, позиции и пользователей
+        (для заказов и позиций — ещё по одному к архиву). Заказы, отменённые
+        к моменту as_of (по умолчанию created_to), учитываются в количестве,
+        но не в выручке и проданных товарах.
+        """
+        from accounts.models import User
+        from orders.models import (
+            ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusHistory,
+            Order, OrderItem, OrderStatusHistory,
+        )
+        
+        as_of = as_of or created_to
+        totals = defaultdict(DailyStatRollup._empty)
+        
+        for model, history in ((Order, OrderStatusHistory), (ArchivedOrder, ArchivedOrderStatusHistory)):
+            paid = ~DailyStatRollup.cancelled_as_of(history, as_of)
+            rows = (
+                model.objects.filter(created_at__gt=created_from, created_at__lte=created_to)
+                .annotate(day=TruncDate('created_at'))
+                .values('day')
+                .annotate(orders=Count('id'), revenue=Sum('total_amount', filter=paid))
+            )
+            for row in rows:
+                totals[row['day']]['total_orders'] += row['orders']
+                totals[row['day']]['total_revenue'] += row['revenue'] or 0
+        
+        for model, history, created_field in (
+            (OrderItem, OrderStatusHistory, 'order__created_at'),
+            (ArchivedOrderItem, ArchivedOrderStatusHistory, 'order_created_at'),
+        ):
+            rows = (
+                model.objects.filter(**{
+                    f'{created_field}__gt': created_from,
+                    f'{created_field}__lte': created_to,
+                })
+                .exclude(DailyStatRollup.cancelled_as_of(history, as_of, 'order', 'order__status'))
+                .annotate(day=TruncDate(created_field))
+                .values('day')
+                .annotate(items=Sum('quantity'))
+            )
+            for row in rows:
+                totals[row['day']]['total_items_sold'] += row['items'] or 0
+        
+        rows = (
+            User.objects.filter(created_at__gt=created_from, created_at__lte=created_to)
+            .annotate(day=TruncDate('created_at'))
+            .values('day')
+            .annotate(users=Count('id'))
+        )
+        for row in rows:
+            totals[row['day']]['new_users'] += row['users']
+        
+        return totals
+    
+    @staticmethod
+    def active_users(start_date, end_date):
+        """Число разных активных пользователей по дням.
+        
+        Основной источник — дневные скетчи HyperLogLog (ActiveUserSketch,
+        ошибка около 1.6%). За дни без скетча считаются пользователи, которые
+        входили, меняли корзину или заказывали; last_login хранит только
+        последний вход, поэтому за прошлые дни такое значение занижено.
+        """
+        from accounts.models import User
+        from cart.models import Cart
+        from orders.models import Order
+        from .models import ActiveUserSketch
+        
+        counts = ActiveUserSketch.counts_by_day(start_date, end_date)
+        if len(counts) == (end_date - start_date).days + 1:
+            return counts
+        
+        start, end = DailyStatRollup.day_bounds(start_date, end_date)
+        
+        def pairs(queryset, field):
+            return (
+                queryset.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+                .annotate(day=TruncDate(field))
+                .order_by()
+                .values_list('day', 'user_id' if queryset.model is not User else 'id')
+            )
+        
+        # UNION убирает повторы пар (день, пользователь)
+        union = pairs(Order.objects.all(), 'created_at').union(
+            pairs(Cart.objects.all(), 'updated_at'),
+            pairs(User.objects.all(), 'last_login'),
+        )
+        fallback = Counter(day for day, _ in union)
+        return {**fallback, **counts}
+    
+    @staticmethod
+    def recompute(start_date, end_date, until=None):
+        """Полный пересчёт дней периода с записью через INSERT ... ON CONFLICT (date).
+        
+        until ограничивает учитываемые строки сверху, чтобы пересчёт
+        не пересекался с тем, что потом добавит инкрементальный режим.
+        """
+        start, end = DailyStatRollup.day_bounds(start_date, end_date)
+        if until is not None:
+            end = min(end, until)
+        
+        # Отмены после until вычтет инкрементальный режим — здесь их не учитываем
+        as_of = until or timezone.now()
+        totals = DailyStatRollup.aggregate(start - timedelta(microseconds=1), end, as_of=as_of)
+        active = DailyStatRollup.active_users(start_date, end_date)
+        
+        days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+        stats = [
+            DailyStat(date=day, active_users=active.get(day, 0), **totals.get(day, DailyStatRollup._empty()))
+            for day in days
+        ]
+        DailyStat.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=[*DailyStatRollup.COUNTERS, 'active_users', 'updated_at'],
+        )
+        DailyStatRollup.recompute_categories(start_date, end_date, until=until)
+        return len(stats)
+    
+    @staticmethod
+    def recompute_categories(start_date, end_date, until=None):
+        """Пересчёт CategoryDailyStat за период: строки периода заменяются целиком"""
+        from orders.models import (
+            ArchivedOrderItem, ArchivedOrderStatusHistory, OrderItem, OrderStatusHistory,
+        )
+        
+        start, end = DailyStatRollup.day_bounds(start_date, end_date)
+        if until is not None:
+            end = min(end, until)
+        as_of = until or timezone.now()
+        
+        totals = defaultdict(lambda: [Decimal('0'), 0])
+        for model, history, created_field in (
+            (OrderItem, OrderStatusHistory, 'order__created_at'),
+            (ArchivedOrderItem, ArchivedOrderStatusHistory, 'order_created_at'),
+        ):
+            rows = (
+                model.objects.filter(**{
+                    f'{created_field}__gte': start,
+                    f'{created_field}__lt': end,
+                })
+                .exclude(DailyStatRollup.cancelled_as_of(history, as_of, 'order', 'order__status'))
+                .annotate(day=TruncDate(created_field))
+                .values('day', 'product__category')
+                .annotate(revenue=Sum(F('quantity') * F('price')), items=Sum('quantity'))
+                .order_by()
+            )
+            for row in rows:
+                total = totals[(row['day'], row['product__category'])]
+                total[0] += row['revenue'] or 0
+                total[1] += row['items'] or 0
+        
+        with transaction.atomic():
+            CategoryDailyStat.objects.filter(date__range=(start_date, end_date)).delete()
+            CategoryDailyStat.objects.bulk_create([
+                CategoryDailyStat(date=day, category_id=category_id, revenue=revenue, items_sold=items)
+                for (day, category_id), (revenue, items) in totals.items()
+            ])
+    
+    @staticmethod
+    def incremental():
+        """Добавление к DailyStat строк, созданных после прошлой отметки.
+        
+        Заказы, впервые отменённые после отметки, вычитаются из выручки
+        и проданных товаров дня их создания. Активные пользователи затронутых дней
+        пересчитываются целиком (уникальные значения не складываются).
+        Возвращает список затронутых дней.
+        """
+        from orders.models import Order, OrderItem, OrderStatusHistory
+        
+        upper = timezone.now() - DailyStatRollup.LAG
+        since = ProcessingWatermark.get_value(DailyStatRollup.WATERMARK)
+        if since is None:
+            # Первый запуск: сегодняшний день считается целиком, прошлые — командой backfill
+            today = timezone.localdate(upper)
+            with transaction.atomic():
+                DailyStatRollup.recompute(today, today, until=upper)
+                ProcessingWatermark.set_value(DailyStatRollup.WATERMARK, upper)
+            return [today]
+        if upper <= since:
+            return []
+        
+        deltas = DailyStatRollup.aggregate(since, upper)
+        
+        # Вычитаются только заказы, ещё не отменённые на момент прошлой отметки:
+        # повторная запись «отменён» в истории не должна вычитать заказ второй раз
+        cancelled_in_window = OrderStatusHistory.objects.filter(
+            order=OuterRef('pk'), status='cancelled', changed_at__gt=since, changed_at__lte=upper,
+        )
+        cancelled_ids = (
+            Order.objects.filter(Exists(cancelled_in_window), created_at__lte=since)
+            .exclude(DailyStatRollup.cancelled_as_of(OrderStatusHistory, since))
+            .values('pk')
+        )
+        refunds = (
+            OrderItem.objects.filter(order_id__in=cancelled_ids)
+            .annotate(day=TruncDate('order__created_at'))
+            .values('day', 'order_id', 'order__total_amount')
+            .annotate(items=Sum('quantity'))
+        )
+        for row in refunds:
+            deltas[row['day']]['total_items_sold'] -= row['items']
+        # Сумма заказа — одна на заказ, а не на позицию
+        refunded_orders = {}
+        for row in refunds:
+            refunded_orders[row['order_id']] = (row['day'], row['order__total_amount'])
+        for day, amount in refunded_orders.values():
+            deltas[day]['total_revenue'] -= amount
+        
+        # Текущий день обновляется всегда: активные пользователи растут и без новых заказов
+        touched = sorted(set(deltas) | {timezone.localdate(upper)})
+        with transaction.atomic():
+            for day in touched:
+                delta = deltas[day]
+                DailyStat.objects.get_or_create(date=day)
+                DailyStat.objects.filter(date=day).update(
+                    updated_at=timezone.now(),
+                    **{field: F(field) + delta[field] for field in DailyStatRollup.COUNTERS}
+                )
+            if touched:
+                active = DailyStatRollup.active_users(touched[0], touched[-1])
+                for day in touched:
+                    DailyStat.objects.filter(date=day).update(active_users=active.get(day, 0))
+                    # Продажи по категориям не складываются из дельт — день пересчитывается
+                    DailyStatRollup.recompute_categories(day, day, until=upper)
+            ProcessingWatermark.set_value(DailyStatRollup.WATERMARK, upper)
+        
+        return touched
+
+
+class MasterStatGenerator:
+    """Статистика всех мастеров за период несколькими сгруппированными запросами.
+    
+    Учитываются позиции неотменённых заказов, созданных в периоде, — и в рабочих
+    таблицах, и в архиве (archive_orders), иначе пересчёт старого периода
+    затёр бы сохранённую статистику нулями.
+    Стоимость материалов считается по рецептам товаров и текущим ценам материалов.
+    """
+    
+    @staticmethod
+    def _items(period_start, period_end):
+        """Позиции неотменённых заказов периода: рабочая таблица и архив"""
+        from orders.models import ArchivedOrderItem, OrderItem
+        
+        start, end = DailyStatRollup.day_bounds(period_start, period_end)
+        return [
+            OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end),
+            ArchivedOrderItem.objects.filter(order_created_at__gte=start, order_created_at__lt=end),
+        ]
+    
+    @staticmethod
+    def _units(period_start, period_end):
+        """{(id мастера, id товара): продано штук} по обоим источникам"""
+        units = Counter()
+        for items in MasterStatGenerator._items(period_start, period_end):
+            rows = (
+                items.exclude(order__status='cancelled')
+                .values('product__master', 'product_id')
+                .annotate(sold=Sum('quantity'))
+                .order_by()
+            )
+            for row in rows:
+                units[(row['product__master'], row['product_id'])] += row['sold'] or 0
+        return units
+    
+    @staticmethod
+    def sales(period_start, period_end):
+        """{id мастера: (заказов, выручка)}"""
+        result = {}
+        for items in MasterStatGenerator._items(period_start, period_end):
+            rows = (
+                items.exclude(order__status='cancelled')
+                .values('product__master')
+                .annotate(orders=Count('order', distinct=True), revenue=Sum(F('quantity') * F('price')))
+                .order_by()
+            )
+            # Заказ лежит либо в рабочей таблице, либо в архиве — счётчики складываются
+            for row in rows:
+                orders, revenue = result.get(row['product__master'], (0, Decimal('0')))
+                result[row['product__master']] = (orders + row['orders'], revenue + (row['revenue'] or 0))
+        return result
+    
+    @staticmethod
+    def top_products(period_start, period_end, units=None):
+        """{id мастера: (название, продано штук)} — самый продаваемый товар мастера"""
+        from products.models import Product
+        
+        if units is None:
+            units = MasterStatGenerator._units(period_start, period_end)
+        best = {}
+        for (master_id, product_id), sold in units.items():
+            current = best.get(master_id)
+            if current is None or (sold, -product_id) > (current[1], -current[0]):
+                best[master_id] = (product_id, sold)
+        
+        names = dict(
+            Product.objects.filter(pk__in=[product_id for product_id, _ in best.values()])
+            .values_list('pk', 'name')
+        )
+        return {
+            master_id: (names.get(product_id, ''), sold)
+            for master_id, (product_id, sold) in best.items()
+        }
+    
+    @staticmethod
+    def materials(period_start, period_end, units=None):
+        """{id мастера: (стоимость материалов, список «материал: расход»)}"""
+        from materials.models import MaterialRecipe
+        
+        if units is None:
+            units = MasterStatGenerator._units(period_start, period_end)
+        sold = defaultdict(int)
+        for (_, product_id), quantity in units.items():
+            sold[product_id] += quantity
+        
+        recipes = MaterialRecipe.objects.filter(product_id__in=list(sold)).values(
+            'product_id', 'product__master', 'consumption_rate', 'waste_factor',
+            'material_id', 'material__name', 'material__unit', 'material__price_per_unit',
+        )
+        used = defaultdict(lambda: defaultdict(Decimal))
+        details = {}
+        for row in recipes:
+            used[row['product__master']][row['material_id']] += (
+                sold[row['product_id']] * row['consumption_rate'] * (1 + row['waste_factor'])
+            )
+            details[row['material_id']] = row
+        
+        result = {}
+        for master_id, amounts in used.items():
+            cost = Decimal('0')
+            lines = []
+            for material_id, amount in sorted(amounts.items(), key=lambda pair: -pair[1]):
+                material = details[material_id]
+                cost += amount * material['material__price_per_unit']
+                lines.append(f"{material['material__name']}: {amount:.3f} {material['material__unit']}")
+            result[master_id] = (cost, lines)
+        return result
+    
+    @staticmethod
+    def generate(period_start, period_end):
+        """Пересчёт MasterStat всех мастеров за период (INSERT ... ON CONFLICT)"""
+        from accounts.models import User
+        
+        sales = MasterStatGenerator.sales(period_start, period_end)
+        units = MasterStatGenerator._units(period_start, period_end)
+        tops = MasterStatGenerator.top_products(period_start, period_end, units)
+        materials = MasterStatGenerator.materials(period_start, period_end, units)
+        
+        master_ids = set(User.objects.filter(role='master').values_list('pk', flat=True))
+        master_ids.update(sales)
+        
+        stats = []
+        for master_id in master_ids:
+            orders, revenue = sales.get(master_id, (0, Decimal('0')))
+            top_name, top_sales = tops.get(master_id, ('', 0))
+            cost, used = materials.get(master_id, (Decimal('0'), []))
+            stats.append(MasterStat(
+                master_id=master_id,
+                period_start=period_start,
+                period_end=period_end,
+                orders_count=orders,
+                revenue=revenue,
+                average_order_value=(Decimal(revenue) / orders).quantize(Decimal('0.01')) if orders else 0,
+                top_product=top_name[:200],
+                top_product_sales=top_sales,
+                materials_cost=Decimal(cost).quantize(Decimal('0.01')),
+                materials_used='\n'.join(used),
+            ))
+        
+        MasterStat.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['master', 'period_start', 'period_end'],
+            update_fields=['orders_count', 'revenue', 'average_order_value', 'top_product',
+                           'top_product_sales', 'materials_cost', 'materials_used', 'generated_at'],
+        )
+        return len(stats)
+
+
+class EventRollup:
+    """Перенос журнала событий в DailyStat и ProductPopularity (инкрементально)"""
+    
+    WATERMARK = 'events'
+    DAILY_FIELDS = {
+        'product_view': 'product_views',
+        'search': 'searches',
+        'cart_add': 'cart_additions',
+        'cart_view': 'cart_views',
+        'checkout': 'checkouts',
+    }
+    
+    @staticmethod
+    def run():
+        # Буфер пишется с задержкой до ANALYTICS_EVENT_FLUSH_INTERVAL — берём с запасом
+        upper = timezone.now() - DailyStatRollup.LAG
+        since = ProcessingWatermark.get_value(EventRollup.WATERMARK)
+        
+        events = Event.objects.filter(created_at__lte=upper)
+        if since:
+            events = events.filter(created_at__gt=since)
+        
+        daily = defaultdict(dict)
+        rows = (
+            events.annotate(day=TruncDate('created_at'))
+            .values('day', 'event_type')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            field = EventRollup.DAILY_FIELDS.get(row['event_type'])
+            if field:
+                daily[row['day']][field] = row['count']
+        
+        products = list(
+            events.filter(product__isnull=False, event_type__in=['product_view', 'cart_add'])
+            .values('product_id')
+            .annotate(
+                views=Count('id', filter=Q(event_type='product_view')),
+                cart_additions=Count('id', filter=Q(event_type='cart_add')),
+            )
+            .order_by()
+        )
+        
+        with transaction.atomic():
+            for day, counts in daily.items():
+                DailyStat.objects.get_or_create(date=day)
+                DailyStat.objects.filter(date=day).update(
+                    updated_at=timezone.now(),
+                    **{field: F(field) + count for field, count in counts.items()}
+                )
+            EventRollup.add_popularity(products)
+            ProcessingWatermark.set_value(EventRollup.WATERMARK, upper)
+        
+        return {'days': len(daily), 'products': len(products)}
+    
+    @staticmethod
+    def add_popularity(rows, batch_size=1000):
+        """Прибавление счётчиков товаров: INSERT ... ON CONFLICT DO UPDATE с суммированием"""
+        table = ProductPopularity._meta.db_table
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset:offset + batch_size]
+                values = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+                params = []
+                for row in batch:
+                    params.extend([row['product_id'], row['views'], row['cart_additions'], now])
+                cursor.execute(
+                    f'INSERT INTO {table} (product_id, views, cart_additions, updated_at) '
+                    f'VALUES {values} '
+                    f'ON CONFLICT (product_id) DO UPDATE SET '
+                    f'views = {table}.views + EXCLUDED.views, '
+                    f'cart_additions = {table}.cart_additions + EXCLUDED.cart_additions, '
+                    f'updated_at = EXCLUDED.updated_at',
+                    params
+                )
+
+
+class AnalyticsDashboard:
+    """Данные панели аналитики: только из дневных агрегатов, без чтения заказов.
+    
+    Результат для периода кэшируется; в ключ входит версия — время последнего
+    обновления агрегатов, так что после очередного пересчёта ключ меняется сам.
+    """
+    
+    CACHE_TIMEOUT = 60 * 60
+    # Все задачи, которые пишут показываемые агрегаты (в т.ч. cart_abandonment_rate)
+    WATERMARKS = [DailyStatRollup.WATERMARK, EventRollup.WATERMARK, AbandonedCartDetector.WATERMARK]
+    
+    @staticmethod
+    def cache_version():
+        watermarks = ProcessingWatermark.objects.filter(
+            name__in=AnalyticsDashboard.WATERMARKS
+        ).aggregate(latest=Max('updated_at'))['latest']
+        master_stats = MasterStat.objects.aggregate(latest=Max('generated_at'))['latest']
+        return '-'.join(
+            str(int(value.timestamp())) if value else '0' for value in (watermarks, master_stats)
+        )
+    
+    @staticmethod
+    def get(start_date, end_date):
+        key = f"analytics:dashboard:{start_date}:{end_date}:{AnalyticsDashboard.cache_version()}"
+        data = cache.get(key)
+        if data is None:
+            data = AnalyticsDashboard.build(start_date, end_date)
+            cache.set(key, data, AnalyticsDashboard.CACHE_TIMEOUT)
+        return data
+    
+    @staticmethod
+    def build(start_date, end_date):
+        from .models import ActiveUserSketch
+        
+        days = DailyStat.objects.filter(date__range=(start_date, end_date))
+        totals = days.aggregate(
+            orders=Sum('total_orders'),
+            revenue=Sum('total_revenue'),
+            items=Sum('total_items_sold'),
+            new_users=Sum('new_users'),
+            product_views=Sum('product_views'),
+            cart_views=Sum('cart_views'),
+            checkouts=Sum('checkouts'),
+        )
+        totals = {name: value or 0 for name, value in totals.items()}
+        active_users = ActiveUserSketch.count_range(start_date, end_date)
+        
+        def percent(part, whole):
+            return round(part * 100 / whole, 1) if whole else 0
+        
+        top_categories = list(
+            CategoryDailyStat.objects.filter(date__range=(start_date, end_date))
+            .values('category__name')
+            .annotate(revenue=Sum('revenue'), items=Sum('items_sold'))
+            .order_by('-revenue')[:10]
+        )
+        top_masters = list(
+            MasterStat.objects.filter(period_start__gte=start_date, period_end__lte=end_date)
+            .values('master__email', 'master__first_name', 'master__last_name')
+            .annotate(revenue=Sum('revenue'), orders=Sum('orders_count'))
+            .order_by('-revenue')[:10]
+        )
+        
+        return {
+            'start': start_date,
+            'end': end_date,
+            'totals': totals,
+            'active_users': active_users,
+            'average_order_value': (totals['revenue'] / totals['orders']) if totals['orders'] else 0,
+            'conversion': percent(totals['orders'], active_users),
+            'cart_conversion': percent(totals['checkouts'], totals['cart_views']),
+            'view_to_cart': percent(totals['cart_views'], totals['product_views']),
+            'daily': list(days.order_by('date').values(
+                'date', 'total_orders', 'total_revenue', 'total_items_sold', 'active_users',
+                'cart_abandonment_rate',
+            )),
+            'top_categories': top_categories,
+            'top_masters': top_masters,
+        }
+
+
+class ProductRankingManager:
+    """Бестселлеры и «в тренде»: обновление при заказе, ночное уплотнение, чтение топа"""
+    
+    EPOCH = 'trending_epoch'
+    HALF_LIFE = timedelta(days=7)
+    DECAY = math.log(2) / HALF_LIFE.total_seconds()
+    # Вклад заказов старше восьми периодов полураспада меньше 1/256 — ими пренебрегаем
+    TRENDING_WINDOW = HALF_LIFE * 8
+    CACHE_TIMEOUT = 60 * 10
+    
+    @staticmethod
+    def epoch():
+        """Эпоха весов trending_score.
+        
+        Читается из ProcessingWatermark при каждой записи продаж, а не из кэша:
+        уплотнение идёт в отдельном процессе, и закэшированная старая эпоха
+        давала бы новым продажам завышенный вес относительно пересчитанных очков.
+        """
+        value = ProcessingWatermark.get_value(ProductRankingManager.EPOCH)
+        if value is None:
+            value = timezone.now()
+            ProcessingWatermark.set_value(ProductRankingManager.EPOCH, value)
+        return value
+    
+    @staticmethod
+    def weight(moment, epoch):
+        return math.exp(ProductRankingManager.DECAY * (moment - epoch).total_seconds())
+    
+    @staticmethod
+    def record_sales(lines, moment=None):
+        """Учёт продаж заказа одним INSERT ... ON CONFLICT DO UPDATE.
+        
+        lines — (id товара, id категории, количество).
+        """
+        if not lines:
+            return
+        weight = ProductRankingManager.weight(moment or timezone.now(), ProductRankingManager.epoch())
+        
+        table = ProductRanking._meta.db_table
+        values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(lines))
+        params = []
+        now = timezone.now()
+        for product_id, category_id, quantity in lines:
+            params.extend([product_id, category_id, quantity, quantity * weight, now])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (product_id, category_id, total_sold, trending_score, updated_at) '
+                f'VALUES {values} '
+                f'ON CONFLICT (product_id) DO UPDATE SET '
+                f'total_sold = {table}.total_sold + EXCLUDED.total_sold, '
+                f'trending_score = {table}.trending_score + EXCLUDED.trending_score, '
+                f'category_id = EXCLUDED.category_id, '
+                f'updated_at = EXCLUDED.updated_at',
+                params
+            )
+    
+    @staticmethod
+    def compact():
+        """Ночное уплотнение: точный пересчёт по заказам и перенос эпохи на текущий момент.
+        
+        total_sold пересчитывается по всем неотменённым заказам (с архивом),
+        trending_score — по заказам последних TRENDING_WINDOW с новой эпохой,
+        поэтому хранимые значения снова начинаются с малых чисел и не растут
+        неограниченно. Отменённые заказы перестают влиять на рейтинги.
+        """
+        from orders.models import ArchivedOrderItem, OrderItem
+        from products.models import Product
+        
+        now = timezone.now()
+        sold = Counter()
+        for model in (OrderItem, ArchivedOrderItem):
+            rows = (
+                model.objects.exclude(order__status='cancelled')
+                .values('product_id')
+                .annotate(sold=Sum('quantity'))
+                .order_by()
+            )
+            for row in rows:
+                sold[row['product_id']] += row['sold'] or 0
+        
+        trending = defaultdict(float)
+        recent = (
+            OrderItem.objects.filter(order__created_at__gte=now - ProductRankingManager.TRENDING_WINDOW)
+            .exclude(order__status='cancelled')
+            .values_list('product_id', 'quantity', 'order__created_at')
+            .iterator(chunk_size=2000)
+        )
+        for product_id, quantity, created_at in recent:
+            trending[product_id] += quantity * ProductRankingManager.weight(created_at, now)
+        
+        categories = dict(
+            Product.objects.filter(pk__in=list(sold)).values_list('pk', 'category_id')
+        )
+        rankings = [
+            ProductRanking(
+                product_id=product_id,
+                category_id=categories.get(product_id),
+                total_sold=sold[product_id],
+                trending_score=trending.get(product_id, 0),
+            )
+            for product_id in categories
+        ]
+        
+        with transaction.atomic():
+            ProductRanking.objects.exclude(product_id__in=list(categories)).delete()
+            ProductRanking.objects.bulk_create(
+                rankings,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['category', 'total_sold', 'trending_score', 'updated_at'],
+            )
+            ProcessingWatermark.set_value(ProductRankingManager.EPOCH, now)
+        return len(rankings)
+    
+    @staticmethod
+    def top(kind='bestsellers', category_id=None, limit=8):
+        """Топ-N активных товаров (из кэша или одним запросом по индексу)"""
+        key = f"rankings:{kind}:{category_id or 'all'}:{limit}"
+        products = cache.get(key)
+        if products is None:
+            order_field = '-trending_score' if kind == 'trending' else '-total_sold'
+            rankings = ProductRanking.objects.filter(product__status='active')
+            if kind == 'trending':
+                rankings = rankings.filter(trending_score__gt=0)
+            if category_id:
+                rankings = rankings.filter(category_id=category_id)
+            products = [
+                ranking.product
+                for ranking in rankings.select_related('product__category').order_by(order_field)[:limit]
+            ]
+            cache.set(key, products, ProductRankingManager.CACHE_TIMEOUT)
+        return products
+
+
+class ProfitabilityEngine:
+    """Доходность товаров за период для всего каталога.
+    
+    Продажи, рецепты и цены материалов загружаются тремя запросами в словари,
+    дальше расчёт идёт в памяти без обращений к БД по каждому товару.
+    Себестоимость единицы — сумма по рецептам расход × (1 + отходы) × цена
+    материала; для товаров без рецептов берётся base_cost.
+    """
+    
+    CENT = Decimal('0.01')
+    
+    @staticmethod
+    def unit_costs(product_ids):
+        """{id товара: стоимость материалов на единицу} одним запросом"""
+        from materials.models import MaterialRecipe
+        
+        costs = defaultdict(Decimal)
+        recipes = MaterialRecipe.objects.filter(product_id__in=product_ids).values_list(
+            'product_id', 'consumption_rate', 'waste_factor', 'material__price_per_unit'
+        )
+        for product_id, rate, waste, price in recipes:
+            costs[product_id] += rate * (1 + waste) * price
+        return costs
+    
+    @staticmethod
+    def compute(period_start, period_end, master=None):
+        from orders.models import OrderItem
+        from products.models import Product
+        
+        start, end = DailyStatRollup.day_bounds(period_start, period_end)
+        items = OrderItem.objects.filter(
+            order__created_at__gte=start, order__created_at__lt=end
+        ).exclude(order__status='cancelled')
+        if master is not None:
+            items = items.filter(product__master=master)
+        
+        sales = {
+            row['product_id']: (row['units'], row['revenue'])
+            for row in items.values('product_id')
+            .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+            .order_by()
+        }
+        products = {
+            pk: (master_id, base_cost)
+            for pk, master_id, base_cost in Product.objects.filter(pk__in=list(sales))
+            .values_list('pk', 'master_id', 'base_cost')
+        }
+        unit_costs = ProfitabilityEngine.unit_costs(list(sales))
+        
+        rows = []
+        for product_id, (units, revenue) in sales.items():
+            master_id, base_cost = products[product_id]
+            unit_cost = unit_costs.get(product_id)
+            if unit_cost is None:
+                unit_cost = base_cost or Decimal('0')
+            cost = (unit_cost * units).quantize(ProfitabilityEngine.CENT)
+            margin = revenue - cost
+            rows.append(ProductProfitability(
+                product_id=product_id,
+                master_id=master_id,
+                period_start=period_start,
+                period_end=period_end,
+                units_sold=units,
+                revenue=revenue,
+                material_cost=cost,
+                margin=margin,
+                margin_percent=(margin * 100 / revenue).quantize(ProfitabilityEngine.CENT) if revenue else 0,
+            ))
+        
+        with transaction.atomic():
+            stale = ProductProfitability.objects.filter(period_start=period_start, period_end=period_end)
+            if master is not None:
+                stale = stale.filter(master=master)
+            stale.exclude(product_id__in=list(sales)).delete()
+            ProductProfitability.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['product', 'period_start', 'period_end'],
+                update_fields=['master', 'units_sold', 'revenue', 'material_cost', 'margin',
+                               'margin_percent', 'computed_at'],
+            )
+        return len(rows)
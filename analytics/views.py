@@ -1,3 +1,39 @@
+from datetime import datetime, timedelta
 from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils import timezone
+from .utils import AnalyticsDashboard
 
-# Create your views here.
+RANGES = [
+    ('7', '7 дней'),
+    ('30', '30 дней'),
+    ('90', '90 дней'),
+    ('365', 'Год'),
+]
+
+@staff_member_required
+def index(request):
+    """Панель аналитики для персонала"""
+    today = timezone.localdate()
+    selected = request.GET.get('range', '30')
+    
+    try:
+        start = datetime.strptime(request.GET.get('start', ''), '%Y-%m-%d').date()
+        end = datetime.strptime(request.GET.get('end', ''), '%Y-%m-%d').date()
+        selected = 'custom'
+    except ValueError:
+        days = int(selected) if selected in dict(RANGES) else 30
+        selected = str(days)
+        end = today
+        start = today - timedelta(days=days - 1)
+    
+    if end < start:
+        start, end = end, start
+    
+    context = {
+        'title': 'Аналитика',
+        'ranges': RANGES,
+        'selected': selected,
+        'stats': AnalyticsDashboard.get(start, end),
+    }
+    return render(request, 'analytics/dashboard.html', context)
@@ -0,0 +1,44 @@
+# benchmark_order_export.py
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'masterskaya.settings')
+django.setup()
+
+from orders.utils import OrderExporter
+
+print("=" * 60)
+print("ЗАМЕР СКОРОСТИ ВЫГРУЗКИ ЗАКАЗОВ")
+print("=" * 60)
+
+# Период: последние N дней (по умолчанию 365)
+days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+end = date.today()
+start = end - timedelta(days=days)
+
+for export_format in ('csv', 'jsonl'):
+    for chunk_size in (500, 2000, 10000):
+        exporter = OrderExporter(start, end, chunk_size=chunk_size)
+        
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = 0
+        size = 0
+        for line in exporter.stream(export_format):
+            rows += 1
+            size += len(line)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        print(f"\n{export_format.upper()}, chunk_size={chunk_size}:")
+        print(f"  Строк: {rows}, объём: {size / 1024 / 1024:.1f} МБ")
+        print(f"  Время: {elapsed:.2f} с, скорость: {rows / elapsed if elapsed else 0:.0f} строк/с")
+        print(f"  Пиковая память Python: {peak / 1024 / 1024:.1f} МБ")
+
+print("\n" + "=" * 60)
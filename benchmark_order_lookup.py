@@ -0,0 +1,75 @@
+# benchmark_order_lookup.py
+import os
+import random
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'masterskaya.settings')
+django.setup()
+
+from django.db import connection
+from accounts.models import User
+from orders.models import Order
+from orders.utils import OrderLookup
+
+print("=" * 60)
+print("ЗАМЕР ПОИСКА ЗАКАЗОВ ДЛЯ ПОДДЕРЖКИ")
+print("=" * 60)
+
+# Количество тестовых заказов (по умолчанию миллион)
+args = [arg for arg in sys.argv[1:] if arg.isdigit()]
+total = int(args[0]) if args else 1_000_000
+batch_size = 10_000
+prefix = 'BENCH-'
+
+user, _ = User.objects.get_or_create(email='benchmark@example.com')
+
+existing = Order.objects.filter(order_number__startswith=prefix).count()
+print(f"\n1. Подготовка данных: есть {existing}, нужно {total}")
+random.seed(42)
+for start in range(existing, total, batch_size):
+    orders = []
+    for i in range(start, min(start + batch_size, total)):
+        phone = f"+7 (9{random.randint(0, 99):02d}) {random.randint(0, 999):03d}-{random.randint(0, 99):02d}-{random.randint(0, 99):02d}"
+        orders.append(Order(
+            user=user,
+            order_number=f"{prefix}{i:08d}",
+            total_amount=random.randint(100, 10000),
+            delivery_address='г. Москва',
+            customer_name=f"Покупатель {i}",
+            customer_phone=phone,
+            customer_phone_digits=Order.normalize_phone(phone),
+            customer_email=f"customer{i}@example.com",
+        ))
+    Order.objects.bulk_create(orders)
+    print(f"   создано {min(start + batch_size, total)}")
+
+with connection.cursor() as cursor:
+    cursor.execute("ANALYZE orders_order")
+
+queries = {
+    'Точный номер': f"{prefix}{total // 2:08d}",
+    'Часть номера': f"{total // 3:08d}"[-5:],
+    'Часть телефона': '123-45',
+    'Часть email': f"customer{total // 7}@",
+}
+
+print("\n2. Поиск:")
+for title, query in queries.items():
+    started = time.perf_counter()
+    for _ in range(10):
+        results = OrderLookup.search(query)
+    elapsed = (time.perf_counter() - started) / 10
+    print(f"   {title} ({query!r}): {len(results)} заказов, {elapsed * 1000:.1f} мс")
+
+print("\n3. План запроса по части телефона:")
+queryset = OrderLookup.filter(Order.objects.all(), '123-45')
+print(queryset.explain(analyze=True))
+
+if '--cleanup' in sys.argv:
+    deleted, _ = Order.objects.filter(order_number__startswith=prefix).delete()
+    print(f"\nУдалено тестовых записей: {deleted}")
+
+print("\n" + "=" * 60)
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count, F, Sum
 from .models import Cart, CartItem
 
 class CartItemInline(admin.TabularInline):
@@ -19,14 +20,33 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at', 'calculate_total', 'item_count')
     inlines = [CartItemInline]
     fields = ('user', 'session_key', 'item_count', 'calculate_total', 'created_at', 'updated_at')
+    list_select_related = ('user',)
+    
+    def get_queryset(self, request):
+        # Сумма и количество позиций считаются в том же запросе, что и список
+        return super().get_queryset(request).annotate(
+            _item_count=Count('items'),
+            _total=Sum(F('items__quantity') * F('items__product__price')),
+        )
     
     def calculate_total(self, obj):
-        return f"{obj.calculate_total()} ₽"
+        return f"{obj._total or 0} ₽"
     calculate_total.short_description = 'Общая сумма'
+    calculate_total.admin_order_field = '_total'
     
     def item_count(self, obj):
-        return obj.item_count()
+        return obj._item_count
     item_count.short_description = 'Количество позиций'
+    item_count.admin_order_field = '_item_count'
+    
+    # Счётчик в шапке сбрасывается один раз на корзину, а не на каждую позицию
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Cart.invalidate_badge(form.instance.user_id)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Cart.invalidate_badge(obj.user_id)
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
@@ -37,4 +57,12 @@ class CartItemAdmin(admin.ModelAdmin):
     
     def calculate_subtotal(self, obj):
         return f"{obj.calculate_subtotal()} ₽"
-    calculate_subtotal.short_description = 'Сумма'
\ No newline at end of file
+    calculate_subtotal.short_description = 'Сумма'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Cart.invalidate_badge(obj.cart.user_id)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Cart.invalidate_badge(obj.cart.user_id)
\ No newline at end of file
@@ -0,0 +1,12 @@
+# cart/context_processors.py
+from .models import Cart
+from .utils import SessionCart
+
+
+def cart_badge(request):
+    """Количество позиций в корзине для значка в шапке сайта"""
+    if not hasattr(request, 'user'):
+        return {}
+    if request.user.is_authenticated:
+        return {'cart_count': Cart.badge_count(request.user)}
+    return {'cart_count': SessionCart(request).count()}
@@ -0,0 +1,112 @@
+# cart/management/commands/purge_stale_carts.py
+import time
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление давно не изменявшихся корзин и истёкших сессий '
+        'небольшими пачками по возрастанию первичного ключа'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=60,
+                            help='Удалять корзины, не изменявшиеся N дней (по умолчанию 60)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Размер пачки: число корзин / сессий (по умолчанию 1000)')
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Пауза между пачками в секундах (по умолчанию 0.1)')
+        parser.add_argument('--skip-sessions', action='store_true',
+                            help='Не удалять истёкшие сессии')
+    
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        
+        started = time.monotonic()
+        carts, items = self.purge_carts(cutoff, options['batch_size'], options['sleep'])
+        self.report('Корзины', carts + items, started,
+                    f'корзин: {carts}, позиций: {items}')
+        
+        if not options['skip_sessions']:
+            started = time.monotonic()
+            sessions = self.purge_sessions(options['batch_size'], options['sleep'])
+            self.report('Сессии', sessions, started, f'сессий: {sessions}')
+    
+    def purge_carts(self, cutoff, batch_size, sleep):
+        """Удаление корзин и их позиций пачками по возрастанию id.
+        
+        Очередная пачка — id следующих устаревших корзин по индексу, поэтому
+        разреженные диапазоны id не дают пустых проходов и лишних пауз.
+        Каждая пачка удаляется в короткой транзакции; updated_at проверяется
+        повторно, чтобы не удалить корзину, изменённую после выборки.
+        """
+        cart_table = Cart._meta.db_table
+        item_table = CartItem._meta.db_table
+        last_id = 0
+        deleted_carts = deleted_items = 0
+        
+        while True:
+            ids = list(
+                Cart.objects.filter(updated_at__lt=cutoff, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            
+            placeholders = ', '.join(['%s'] * len(ids))
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {item_table} WHERE cart_id IN ('
+                    f'SELECT id FROM {cart_table} WHERE id IN ({placeholders}) AND updated_at < %s)',
+                    [*ids, cutoff]
+                )
+                deleted_items += cursor.rowcount
+                cursor.execute(
+                    f'DELETE FROM {cart_table} WHERE id IN ({placeholders}) AND updated_at < %s',
+                    [*ids, cutoff]
+                )
+                deleted_carts += cursor.rowcount
+            last_id = ids[-1]
+            
+            if sleep:
+                time.sleep(sleep)
+        
+        return deleted_carts, deleted_items
+    
+    def purge_sessions(self, batch_size, sleep):
+        """Удаление истёкших сессий пачками по возрастанию ключа сессии"""
+        now = timezone.now()
+        last_key = ''
+        deleted = 0
+        
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now, session_key__gt=last_key)
+                .order_by('session_key')
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            last_key = keys[-1]
+            
+            if sleep:
+                time.sleep(sleep)
+        
+        return deleted
+    
+    def report(self, title, rows, started, details):
+        elapsed = time.monotonic() - started
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{title}: удалено {details} за {elapsed:.1f} с ({rate:.0f} строк/с)'
+        ))
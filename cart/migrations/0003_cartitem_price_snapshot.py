@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_cart_is_abandoned_cart_cart_cart_updated_c46eb6_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='previous_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Прежняя цена'),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Цена при добавлении'),
+        ),
+        # Для уже лежащих в корзинах позиций точка отсчёта — текущая цена товара
+        migrations.RunSQL(
+            sql="""
+                UPDATE cart_cartitem AS ci
+                SET price = p.price
+                FROM products_product AS p
+                WHERE p.id = ci.product_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import Count, F, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
 from accounts.models import User
 from products.models import Product
 
@@ -7,31 +10,114 @@ class Cart(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
     session_key = models.CharField('Ключ сессии', max_length=40, null=True, blank=True)
+    # Заполняется задачей detect_abandoned_carts: None — ещё не классифицирована
+    is_abandoned = models.BooleanField('Брошена', null=True, blank=True)
     
     class Meta:
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"Корзина пользователя {self.user.email}"
     
+    @classmethod
+    def get_for_user(cls, user):
+        """Текущая (последняя изменённая) корзина пользователя"""
+        cart = cls.objects.filter(user=user).order_by('-updated_at').first()
+        if cart is None:
+            cart = cls.objects.create(user=user)
+        return cart
+    
     def calculate_total(self):
-        """Расчет общей суммы корзины"""
-        total = sum(item.calculate_subtotal() for item in self.items.all())
-        return total
+        """Расчет общей суммы корзины (одним агрегирующим запросом)"""
+        total = self.items.aggregate(total=Sum(F('quantity') * F('product__price')))['total']
+        return total or 0
     
     def item_count(self):
         """Количество позиций в корзине"""
         return self.items.count()
     
+    def summary(self):
+        """Позиции с суммами, итог и количество позиций одним запросом"""
+        items = list(
+            self.items.select_related('product')
+            .annotate(subtotal=F('quantity') * F('product__price'))
+            .order_by('added_at')
+        )
+        return {
+            'items': items,
+            'total': sum(item.subtotal for item in items),
+            'count': len(items),
+        }
+    
+    def price_diff(self):
+        """Позиции, у которых изменилась цена или которые стали недоступны.
+        
+        Один запрос на корзину. Возвращает {id товара: {'changed': bool,
+        'unavailable': bool, 'old_price', 'new_price'}} только для проблемных позиций.
+        """
+        rows = (
+            self.items
+            .annotate(added_price=Coalesce('previous_price', 'price'))
+            .filter(
+                Q(added_price__isnull=False) & ~Q(added_price=F('product__price'))
+                | ~Q(product__status='active')
+                | Q(product__stock_quantity__lt=F('quantity'))
+            )
+            .values('product_id', 'quantity', 'added_price', 'product__price',
+                    'product__status', 'product__stock_quantity')
+        )
+        return {
+            row['product_id']: {
+                'changed': row['added_price'] is not None and row['added_price'] != row['product__price'],
+                'unavailable': (row['product__status'] != 'active'
+                                or row['product__stock_quantity'] < row['quantity']),
+                'old_price': row['added_price'],
+                'new_price': row['product__price'],
+            }
+            for row in rows
+        }
+    
     def clear(self):
         """Очистка корзины"""
         self.items.all().delete()
+        self.invalidate_badge(self.user_id)
+    
+    # ------------------------------------------------------------------
+    # Счётчик корзины в шапке сайта
+    # ------------------------------------------------------------------
+    BADGE_TIMEOUT = 60 * 60
+    
+    @staticmethod
+    def badge_cache_key(user_id):
+        return f"cart_badge:{user_id}"
+    
+    @classmethod
+    def badge_count(cls, user):
+        """Количество позиций в текущей корзине пользователя (из кэша)"""
+        key = cls.badge_cache_key(user.pk)
+        count = cache.get(key)
+        if count is None:
+            latest_cart = cls.objects.filter(user=user).order_by('-updated_at').values('pk')[:1]
+            count = CartItem.objects.filter(cart=Subquery(latest_cart)).count()
+            cache.set(key, count, cls.BADGE_TIMEOUT)
+        return count
+    
+    @classmethod
+    def invalidate_badge(cls, user_id):
+        cache.delete(cls.badge_cache_key(user_id))
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cart_items')
     quantity = models.IntegerField('Количество', default=1)
+    # Цена товара на момент добавления в корзину
+    price = models.DecimalField('Цена при добавлении', max_digits=10, decimal_places=2, null=True, blank=True)
+    # Цена, которую покупатель видел до изменения мастером (заполняется refresh_prices)
+    previous_price = models.DecimalField('Прежняя цена', max_digits=10, decimal_places=2, null=True, blank=True)
     added_at = models.DateTimeField('Дата добавления', auto_now_add=True)
     
     class Meta:
@@ -42,6 +128,19 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.product.name} x{self.quantity}"
     
+    @classmethod
+    def refresh_prices(cls, product_id, new_price):
+        """Обновление цены во всех корзинах с товаром одним UPDATE.
+        
+        Первоначальная цена сохраняется в previous_price, чтобы покупатель
+        увидел изменение. Возвращает число обновлённых позиций.
+        """
+        return (
+            cls.objects.filter(product_id=product_id)
+            .exclude(price=new_price)
+            .update(previous_price=Coalesce('previous_price', 'price'), price=new_price)
+        )
+    
     def calculate_subtotal(self):
         """Расчет стоимости позиции"""
         return self.product.price * self.quantity
@@ -0,0 +1,34 @@
+# cart/signals.py
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from products.models import Product
+
+from .models import CartItem
+from .utils import CartManager
+
+
+@receiver(user_logged_in)
+def merge_anonymous_cart(sender, request, user, **kwargs):
+    """Перенос анонимной корзины в корзину пользователя при входе"""
+    if request is not None and hasattr(request, 'session'):
+        CartManager.merge_session_cart(request, user)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_price(sender, instance, update_fields=None, **kwargs):
+    """Запоминаем прежнюю цену товара перед сохранением"""
+    instance._old_price = None
+    if instance.pk and (update_fields is None or 'price' in update_fields):
+        instance._old_price = (
+            Product.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def refresh_cart_prices(sender, instance, created, **kwargs):
+    """Мастер изменил цену — обновляем все корзины с товаром одним UPDATE"""
+    old_price = getattr(instance, '_old_price', None)
+    if not created and old_price is not None and old_price != instance.price:
+        CartItem.refresh_prices(instance.pk, instance.price)
@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.cart_view, name='cart_detail'),
-]
\ No newline at end of file
+    path('add/<int:product_id>/', views.cart_add, name='cart_add'),
+    path('update/<int:product_id>/', views.cart_update, name='cart_update'),
+    path('remove/<int:product_id>/', views.cart_remove, name='cart_remove'),
+]
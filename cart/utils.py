@@ -0,0 +1,225 @@
+# cart/utils.py
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Cart, CartItem
+from products.models import Product
+
+
+class SessionCart:
+    """Корзина анонимного покупателя.
+    
+    Содержимое хранится в кэше компактным словарём {id товара: количество},
+    в сессии лежит только токен корзины. Добавление товара не пишет в БД:
+    сессия сохраняется один раз, когда токен создаётся.
+    Кэш должен быть общим для всех процессов (см. CACHES в настройках),
+    иначе корзина теряется при переходе запроса на другой воркер.
+    """
+    
+    SESSION_KEY = 'cart_token'
+    TIMEOUT = settings.SESSION_COOKIE_AGE
+    
+    def __init__(self, request):
+        self.session = request.session
+        self.token = self.session.get(self.SESSION_KEY)
+    
+    @property
+    def cache_key(self):
+        return f"cart:anon:{self.token}"
+    
+    def items(self):
+        """Содержимое корзины: {id товара: количество}"""
+        if not self.token:
+            return {}
+        return cache.get(self.cache_key) or {}
+    
+    def _save(self, data):
+        if not self.token:
+            self.token = uuid.uuid4().hex
+            self.session[self.SESSION_KEY] = self.token
+        cache.set(self.cache_key, data, self.TIMEOUT)
+    
+    def add(self, product_id, quantity=1):
+        data = self.items()
+        data[product_id] = data.get(product_id, 0) + quantity
+        self._save(data)
+    
+    def set(self, product_id, quantity):
+        data = self.items()
+        if quantity > 0:
+            data[product_id] = quantity
+        else:
+            data.pop(product_id, None)
+        self._save(data)
+    
+    def remove(self, product_id):
+        self.set(product_id, 0)
+    
+    def clear(self):
+        if self.token:
+            cache.delete(self.cache_key)
+    
+    def count(self):
+        return len(self.items())
+
+
+class CartManager:
+    """Класс для работы с корзиной покупателя (авторизованного или анонимного)"""
+    
+    @staticmethod
+    def add(request, product, quantity=1):
+        """Добавление товара в корзину"""
+        if not request.user.is_authenticated:
+            SessionCart(request).add(product.id, quantity)
+            return
+        
+        cart = Cart.get_for_user(request.user)
+        item, created = CartItem.objects.get_or_create(
+            cart=cart, product=product, defaults={'quantity': quantity, 'price': product.price}
+        )
+        if not created:
+            CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + quantity)
+        cart.save(update_fields=['updated_at'])
+        Cart.invalidate_badge(request.user.pk)
+    
+    @staticmethod
+    def update(request, product_id, quantity):
+        """Изменение количества (0 — удаление позиции)"""
+        if not request.user.is_authenticated:
+            SessionCart(request).set(product_id, quantity)
+            return
+        
+        cart = Cart.get_for_user(request.user)
+        items = CartItem.objects.filter(cart=cart, product_id=product_id)
+        if quantity > 0:
+            items.update(quantity=quantity)
+        else:
+            items.delete()
+        cart.save(update_fields=['updated_at'])
+        Cart.invalidate_badge(request.user.pk)
+    
+    @staticmethod
+    def remove(request, product_id):
+        CartManager.update(request, product_id, 0)
+    
+    @staticmethod
+    def get_lines(request):
+        """Позиции корзины для отображения"""
+        if request.user.is_authenticated:
+            summary = Cart.get_for_user(request.user).summary()
+            return [
+                {'product': item.product, 'quantity': item.quantity, 'subtotal': item.subtotal}
+                for item in summary['items']
+            ]
+        
+        data = SessionCart(request).items()
+        products = Product.objects.in_bulk(list(data))
+        return [
+            {'product': products[product_id], 'quantity': quantity,
+             'subtotal': products[product_id].price * quantity}
+            for product_id, quantity in data.items()
+            if product_id in products
+        ]
+    
+    @staticmethod
+    def price_diff(request):
+        """Изменения цен и доступности позиций (см. Cart.price_diff).
+        
+        Анонимная корзина не хранит цену при добавлении, поэтому для неё
+        изменений цен нет; доступность проверяет CartValidator.
+        """
+        if not request.user.is_authenticated:
+            return {}
+        return Cart.get_for_user(request.user).price_diff()
+    
+    @staticmethod
+    def merge_session_cart(request, user):
+        """Перенос анонимной корзины в корзину пользователя при входе.
+        
+        Количества складываются с уже лежащими в корзине и записываются
+        одним INSERT ... ON CONFLICT DO UPDATE.
+        """
+        session_cart = SessionCart(request)
+        data = session_cart.items()
+        if not data:
+            return 0
+        
+        cart = Cart.get_for_user(user)
+        existing = dict(
+            cart.items.filter(product_id__in=data).values_list('product_id', 'quantity')
+        )
+        active_prices = dict(
+            Product.objects.filter(pk__in=data, status='active').values_list('pk', 'price')
+        )
+        # Цена фиксируется только для новых позиций: при конфликте обновляется количество
+        items = [
+            CartItem(cart=cart, product_id=product_id, quantity=existing.get(product_id, 0) + quantity,
+                     price=active_prices[product_id])
+            for product_id, quantity in data.items()
+            if product_id in active_prices
+        ]
+        CartItem.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=['cart', 'product'],
+            update_fields=['quantity'],
+        )
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+        Cart.invalidate_badge(user.pk)
+        session_cart.clear()
+        return len(items)
+
+
+class CartValidator:
+    """Проверка доступности всех позиций корзины за фиксированное число запросов"""
+    
+    @staticmethod
+    def validate(lines):
+        """Проверка наличия товаров и достаточности материалов.
+        
+        lines — позиции вида {'product': Product, 'quantity': int}.
+        Потребность в общих материалах суммируется по всем позициям.
+        Возвращает {'valid': bool, 'problems': {id товара: [описания проблем]}}.
+        """
+        from materials.models import MaterialRecipe
+        
+        problems = defaultdict(list)
+        quantities = {}
+        
+        for line in lines:
+            product, quantity = line['product'], line['quantity']
+            quantities[product.id] = quantity
+            if product.status != 'active':
+                problems[product.id].append('Товар снят с продажи')
+            elif product.stock_quantity < quantity:
+                problems[product.id].append(f'На складе только {product.stock_quantity} шт.')
+        
+        # Все рецепты позиций одним запросом
+        recipes = MaterialRecipe.objects.filter(
+            product_id__in=list(quantities)
+        ).select_related('material')
+        
+        demand = defaultdict(int)
+        materials = {}
+        users = defaultdict(list)
+        for recipe in recipes:
+            demand[recipe.material_id] += recipe.get_total_consumption(quantities[recipe.product_id])
+            materials[recipe.material_id] = recipe.material
+            users[recipe.material_id].append(recipe.product_id)
+        
+        for material_id, needed in demand.items():
+            material = materials[material_id]
+            if not material.check_availability(needed):
+                message = (
+                    f'Недостаточно материала «{material.name}»: нужно {needed:.2f}, '
+                    f'доступно {material.current_quantity:.2f} {material.get_unit_display()}'
+                )
+                for product_id in users[material_id]:
+                    problems[product_id].append(message)
+        
+        return {'valid': not problems, 'problems': dict(problems)}
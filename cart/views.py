@@ -1,6 +1,59 @@
-from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from products.models import Product
+from analytics.events import track
+from .utils import CartManager, CartValidator
 
-@login_required
 def cart_view(request):
-    return render(request, 'cart/cart.html')
\ No newline at end of file
+    """Корзина (доступна и без входа в систему)"""
+    lines = CartManager.get_lines(request)
+    diff = CartManager.price_diff(request)
+    validation = CartValidator.validate(lines)
+    for line in lines:
+        line['problems'] = validation['problems'].get(line['product'].id, [])
+        change = diff.get(line['product'].id)
+        line['price_changed'] = bool(change and change['changed'])
+        line['added_price'] = change['old_price'] if change else None
+    if lines:
+        track('cart_view', request)
+    
+    context = {
+        'lines': lines,
+        'total': sum(line['subtotal'] for line in lines),
+        'can_checkout': validation['valid'],
+        'title': 'Корзина',
+    }
+    return render(request, 'cart/cart.html', context)
+
+def _parse_quantity(request, default=1):
+    try:
+        return max(int(request.POST.get('quantity', default)), 0)
+    except (TypeError, ValueError):
+        return default
+
+def _cart_response(request, message):
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({'success': True, 'message': message})
+    return redirect('cart_detail')
+
+@require_POST
+def cart_add(request, product_id):
+    """Добавление товара в корзину"""
+    product = get_object_or_404(Product, id=product_id, status='active')
+    quantity = _parse_quantity(request) or 1
+    CartManager.add(request, product, quantity)
+    track('cart_add', request, product_id=product.id)
+    return _cart_response(request, f'Товар "{product.name}" добавлен в корзину')
+
+@require_POST
+def cart_update(request, product_id):
+    """Изменение количества товара в корзине"""
+    CartManager.update(request, product_id, _parse_quantity(request))
+    return _cart_response(request, 'Корзина обновлена')
+
+@require_POST
+def cart_remove(request, product_id):
+    """Удаление товара из корзины"""
+    CartManager.remove(request, product_id)
+    return _cart_response(request, 'Товар удалён из корзины')
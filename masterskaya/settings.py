@@ -68,6 +68,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'accounts.middleware.EmailConfirmationMiddleware',
+    'analytics.middleware.ActiveUserMiddleware',
 ]
 
 ROOT_URLCONF = 'masterskaya.urls'
@@ -83,6 +84,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'cart.context_processors.cart_badge',
+                'notifications.context_processors.notification_badge',
             ],
         },
     },
@@ -137,6 +140,19 @@ DATABASES = {
 }
 
 
+# Кэш общий для всех процессов (веб-воркеры, команды, воркер уведомлений):
+# счётчики в шапке, отметки и сброс кэшей должны быть видны каждому процессу.
+# На нём держатся корзины анонимных покупателей (cart.utils.SessionCart) и
+# сброс кэшей счётчика корзины, дашборда, рейтингов товаров и ленты отзывов;
+# кэш в памяти процесса (LocMemCache) для них не подходит
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        'KEY_PREFIX': 'masterskaya',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -227,4 +243,11 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
 # Настройки CSRF
 CSRF_COOKIE_SECURE = False  # True для production с HTTPS
-CSRF_COOKIE_HTTPONLY = True
\ No newline at end of file
+CSRF_COOKIE_HTTPONLY = True
+
+# Время жизни ключа идемпотентности оформления заказа (в секундах)
+ORDER_IDEMPOTENCY_TTL = 60 * 60 * 24  # 24 часа
+
+# Буфер журнала событий аналитики: запись в БД пачкой по размеру или по времени
+ANALYTICS_EVENT_BUFFER_SIZE = 500
+ANALYTICS_EVENT_FLUSH_INTERVAL = 10  # секунд
\ No newline at end of file
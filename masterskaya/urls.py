@@ -13,6 +13,8 @@ urlpatterns = [
     path('materials/', include('materials.urls')),
     path('orders/', include('orders.urls')),
     path('reviews/', include('reviews.urls')),
+    path('analytics/', include('analytics.urls')),
+    path('notifications/', include('notifications.urls')),
 ]
 
 if settings.DEBUG:
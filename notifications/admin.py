@@ -8,7 +8,7 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'notification_type', 'title', 'is_read', 'created_at', 'read_at')
     list_filter = ('notification_type', 'is_read', 'created_at', 'sent_via_email', 'sent_via_push')
     search_fields = ('user__email', 'title', 'message')
-    readonly_fields = ('created_at', 'read_at', 'mark_as_read_button')
+    readonly_fields = ('created_at', 'read_at', 'mark_as_read_button', 'email_attempts', 'emailed_at', 'email_error')
     list_editable = ('is_read',)
     fieldsets = (
         ('Основная информация', {
@@ -20,6 +20,9 @@ class NotificationAdmin(admin.ModelAdmin):
         ('Статус доставки', {
             'fields': ('is_read', 'mark_as_read_button', 'sent_via_email', 'sent_via_push')
         }),
+        ('Отправка по email', {
+            'fields': ('deliver_by_email', 'email_attempts', 'next_attempt_at', 'emailed_at', 'email_error')
+        }),
         ('Даты', {
             'fields': ('created_at', 'read_at'),
             'classes': ('collapse',)
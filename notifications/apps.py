@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class NotificationsConfig(AppConfig):
     name = 'notifications'
-    verbose_name = 'Уведомления'
\ No newline at end of file
+    verbose_name = 'Уведомления'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
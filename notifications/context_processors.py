@@ -0,0 +1,9 @@
+# notifications/context_processors.py
+from .models import Notification
+
+
+def notification_badge(request):
+    """Количество непрочитанных уведомлений для значка в шапке сайта"""
+    if not hasattr(request, 'user') or not request.user.is_authenticated:
+        return {}
+    return {'unread_notifications': Notification.unread_count(request.user)}
@@ -0,0 +1,46 @@
+# notifications/management/commands/deliver_notifications.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.utils import NotificationOutbox
+
+
+class Command(BaseCommand):
+    help = 'Отправка уведомлений из очереди по email (разово или в цикле с --loop)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=NotificationOutbox.BATCH_SIZE,
+                            help='Писем в одной пачке (по умолчанию 100)')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Не больше стольких пачек за проход')
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, проверяя очередь каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза между проходами в режиме --loop (по умолчанию 5 с)')
+    
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            try:
+                sent, failed = NotificationOutbox.deliver(
+                    batch_size=options['batch_size'],
+                    max_batches=options['max_batches'],
+                )
+            except Exception as e:
+                # Почтовый сервер недоступен: в цикле пробуем снова на следующем проходе
+                if not options['loop']:
+                    raise
+                self.stderr.write(f'Не удалось отправить уведомления: {e}')
+                sent = failed = 0
+            
+            if sent or failed or not options['loop']:
+                self.stdout.write(
+                    f'Отправлено: {sent}, с ошибкой: {failed} за {time.monotonic() - started:.1f} с'
+                )
+            if not options['loop']:
+                break
+            
+            close_old_connections()
+            time.sleep(options['interval'])
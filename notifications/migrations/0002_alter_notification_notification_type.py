@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('order_status', 'Изменение статуса заказа'), ('new_order', 'Новый заказ'), ('low_stock', 'Низкий запас материалов'), ('review', 'Новый отзыв'), ('system', 'Системное уведомление'), ('promotion', 'Акция или предложение'), ('cart_reminder', 'Напоминание о корзине')], max_length=20, verbose_name='Тип уведомления'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_alter_notification_notification_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='deliver_by_email',
+            field=models.BooleanField(default=False, verbose_name='Отправить по email'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_error',
+            field=models.TextField(blank=True, verbose_name='Ошибка отправки'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='emailed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки по email'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Следующая попытка'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('order_status', 'Изменение статуса заказа'), ('new_order', 'Новый заказ'), ('low_stock', 'Низкий запас материалов'), ('review', 'Новый отзыв'), ('system', 'Системное уведомление'), ('promotion', 'Акция или предложение'), ('cart_reminder', 'Напоминание о корзине'), ('email_confirmation', 'Подтверждение email')], max_length=20, verbose_name='Тип уведомления'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('deliver_by_email', True), ('sent_via_email', False)), fields=['next_attempt_at', 'id'], name='notification_outbox_idx'),
+        ),
+    ]
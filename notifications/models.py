@@ -1,4 +1,6 @@
+from django.core.cache import cache
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 
 class Notification(models.Model):
@@ -9,6 +11,8 @@ class Notification(models.Model):
         ('review', 'Новый отзыв'),
         ('system', 'Системное уведомление'),
         ('promotion', 'Акция или предложение'),
+        ('cart_reminder', 'Напоминание о корзине'),
+        ('email_confirmation', 'Подтверждение email'),
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -25,6 +29,13 @@ class Notification(models.Model):
     sent_via_email = models.BooleanField('Отправлено по email', default=False)
     sent_via_push = models.BooleanField('Отправлено как push', default=False)
     
+    # Очередь отправки по email (доставляет команда deliver_notifications)
+    deliver_by_email = models.BooleanField('Отправить по email', default=False)
+    email_attempts = models.PositiveSmallIntegerField('Попыток отправки', default=0)
+    next_attempt_at = models.DateTimeField('Следующая попытка', null=True, blank=True)
+    email_error = models.TextField('Ошибка отправки', blank=True)
+    emailed_at = models.DateTimeField('Дата отправки по email', null=True, blank=True)
+    
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     read_at = models.DateTimeField('Дата прочтения', null=True, blank=True)
     
@@ -32,16 +43,72 @@ class Notification(models.Model):
         verbose_name = 'Уведомление'
         verbose_name_plural = 'Уведомления'
         ordering = ['-created_at']
+        indexes = [
+            # Неотправленные письма для воркера доставки
+            models.Index(fields=['next_attempt_at', 'id'], name='notification_outbox_idx',
+                         condition=models.Q(deliver_by_email=True, sent_via_email=False)),
+            # Непрочитанные уведомления пользователя (счётчик и список)
+            models.Index(fields=['user'], name='notification_unread_idx',
+                         condition=models.Q(is_read=False)),
+        ]
     
     def __str__(self):
         return f"{self.get_notification_type_display()}: {self.title}"
     
+    UNREAD_TIMEOUT = 60 * 60
+    
     def mark_as_read(self):
         """Пометить как прочитанное"""
         if not self.is_read:
             self.is_read = True
-            self.read_at = models.DateTimeField(auto_now=True)
-            self.save()
+            self.read_at = timezone.now()
+            Notification.mark_read(self.user_id, [self.pk])
+    
+    @staticmethod
+    def unread_cache_key(user_id):
+        return f"notifications_unread:{user_id}"
+    
+    @classmethod
+    def unread_count(cls, user):
+        """Количество непрочитанных уведомлений пользователя (из кэша)"""
+        key = cls.unread_cache_key(user.pk)
+        count = cache.get(key)
+        if count is None:
+            count = cls.objects.filter(user=user, is_read=False).count()
+            cache.set(key, count, cls.UNREAD_TIMEOUT)
+        return count
+    
+    @classmethod
+    def adjust_unread(cls, user_id, delta):
+        """Сдвиг закэшированного счётчика; если его нет, он посчитается при следующем чтении"""
+        try:
+            cache.incr(cls.unread_cache_key(user_id), delta)
+        except ValueError:
+            pass
+    
+    @classmethod
+    def invalidate_unread(cls, user_id):
+        cache.delete(cls.unread_cache_key(user_id))
+    
+    @classmethod
+    def mark_read(cls, user_id, ids):
+        """Пометить указанные уведомления пользователя прочитанными одним UPDATE"""
+        updated = cls.objects.filter(user_id=user_id, pk__in=ids, is_read=False).update(
+            is_read=True, read_at=timezone.now()
+        )
+        if updated:
+            cls.adjust_unread(user_id, -updated)
+        return updated
+    
+    @classmethod
+    def mark_all_read(cls, user_id):
+        """Пометить прочитанными все уведомления пользователя одним UPDATE"""
+        updated = cls.objects.filter(user_id=user_id, is_read=False).update(
+            is_read=True, read_at=timezone.now()
+        )
+        # Непрочитанных не осталось — счётчик известен точно
+        cache.set(cls.unread_cache_key(user_id), 0, cls.UNREAD_TIMEOUT)
+        return updated
     
     @classmethod
     def create_order_status_notification(cls, user, order, status_message):
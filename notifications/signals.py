@@ -0,0 +1,22 @@
+# notifications/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_on_save(sender, instance, created, **kwargs):
+    """Новое непрочитанное уведомление увеличивает счётчик; правка — сбрасывает его"""
+    if created:
+        if not instance.is_read:
+            transaction.on_commit(lambda: Notification.adjust_unread(instance.user_id, 1))
+    else:
+        transaction.on_commit(lambda: Notification.invalidate_unread(instance.user_id))
+
+
+@receiver(post_delete, sender=Notification)
+def update_unread_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        transaction.on_commit(lambda: Notification.adjust_unread(instance.user_id, -1))
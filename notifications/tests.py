@@ -1,3 +1,128 @@
-from django.test import TestCase
+# notifications/tests.py
+import contextlib
+import io
+import smtplib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+
+from .models import Notification
+from .utils import NotificationOutbox
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class NotificationOutboxTest(TestCase):
+    """Отправка очереди уведомлений через locmem-бэкенд почты"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer@example.com', 'password', email_confirmed=True)
+    
+    def enqueue(self, **fields):
+        return Notification.objects.create(
+            user=self.user,
+            notification_type='system',
+            title='Заказ отправлен',
+            message='Ваш заказ передан в доставку',
+            deliver_by_email=True,
+            **fields
+        )
+    
+    def test_deliver_sends_and_marks_notifications(self):
+        first, second = self.enqueue(), self.enqueue()
+        Notification.objects.create(user=self.user, notification_type='system', title='Только на сайте',
+                                    message='Без письма')
+        
+        self.assertEqual(NotificationOutbox.deliver(), (2, 0))
+        
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertEqual(mail.outbox[0].subject, 'Заказ отправлен')
+        for notification in (first, second):
+            notification.refresh_from_db()
+            self.assertTrue(notification.sent_via_email)
+            self.assertIsNotNone(notification.emailed_at)
+        self.assertEqual(NotificationOutbox.deliver(), (0, 0))
+    
+    def test_failed_send_is_retried_with_backoff(self):
+        notification = self.enqueue()
+        refused = smtplib.SMTPRecipientsRefused({self.user.email: (550, b'No such user')})
+        
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=refused):
+            before = timezone.now()
+            self.assertEqual(NotificationOutbox.deliver(), (0, 1))
+            notification.refresh_from_db()
+            self.assertEqual(notification.email_attempts, 1)
+            self.assertFalse(notification.sent_via_email)
+            self.assertIn('No such user', notification.email_error)
+            self.assertGreaterEqual(
+                notification.next_attempt_at, before + timedelta(seconds=NotificationOutbox.RETRY_DELAY)
+            )
+            
+            # До следующей попытки строка не выбирается, затем задержка удваивается
+            self.assertEqual(NotificationOutbox.deliver(), (0, 0))
+            Notification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+            before = timezone.now()
+            self.assertEqual(NotificationOutbox.deliver(), (0, 1))
+            notification.refresh_from_db()
+            self.assertEqual(notification.email_attempts, 2)
+            self.assertGreaterEqual(
+                notification.next_attempt_at, before + timedelta(seconds=NotificationOutbox.RETRY_DELAY * 2)
+            )
+        self.assertEqual(mail.outbox, [])
+    
+    def test_rows_at_max_attempts_are_skipped(self):
+        abandoned = self.enqueue(email_attempts=NotificationOutbox.MAX_ATTEMPTS)
+        
+        self.assertEqual(NotificationOutbox.deliver(), (0, 0))
+        
+        self.assertEqual(mail.outbox, [])
+        abandoned.refresh_from_db()
+        self.assertFalse(abandoned.sent_via_email)
+        self.assertIsNone(abandoned.next_attempt_at)
+    
+    def test_connection_error_releases_batch_without_attempts(self):
+        notifications = [self.enqueue() for _ in range(3)]
+        send = EmailBackend.send_messages
+        calls = []
+        
+        def drop_second(backend, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+            return send(backend, messages)
+        
+        with mock.patch.object(EmailBackend, 'send_messages', drop_second):
+            with self.assertRaises(smtplib.SMTPServerDisconnected):
+                NotificationOutbox.deliver()
+        
+        self.assertEqual(len(mail.outbox), 1)
+        rows = list(
+            Notification.objects.filter(pk__in=[n.pk for n in notifications])
+            .order_by('pk').values_list('sent_via_email', 'email_attempts', 'next_attempt_at')
+        )
+        self.assertTrue(rows[0][0])
+        self.assertEqual(rows[1:], [(False, 0, None), (False, 0, None)])
+        self.assertEqual(NotificationOutbox.deliver(), (2, 0))
+    
+    def test_send_confirmation_email_only_enqueues(self):
+        request = RequestFactory().get('/accounts/register/')
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.user.send_confirmation_email(request)
+        
+        self.assertEqual(mail.outbox, [])
+        notification = Notification.objects.get(user=self.user, notification_type='email_confirmation')
+        self.assertTrue(notification.deliver_by_email)
+        self.assertFalse(notification.sent_via_email)
+        self.assertEqual(notification.email_attempts, 0)
@@ -5,4 +5,6 @@ app_name = 'notifications'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('read/', views.mark_read, name='mark_read'),
+    path('read-all/', views.mark_all_read, name='mark_all_read'),
 ]
@@ -0,0 +1,129 @@
+# notifications/utils.py
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+
+class NotificationOutbox:
+    """Доставка уведомлений по email через очередь в таблице уведомлений.
+    
+    Уведомление с deliver_by_email=True создаётся в той же транзакции, что и
+    изменение, о котором оно сообщает, а письмо отправляет отдельный воркер.
+    Воркер забирает пачку через SELECT ... FOR UPDATE SKIP LOCKED и в той же
+    короткой транзакции сдвигает next_attempt_at на LEASE вперёд: другие
+    воркеры пачку не возьмут, а блокировки снимаются до отправки писем.
+    Если воркер упадёт посреди пачки, по истечении аренды её заберёт другой.
+    Письма уходят через одно открытое соединение с почтовым сервером;
+    неудачные получают повторную попытку с экспоненциальной задержкой.
+    Обрыв соединения — не ошибка письма: проход останавливается, аренда
+    оставшихся строк снимается, а попытки не расходуются.
+    """
+    
+    BATCH_SIZE = 100
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 60  # секунд перед второй попыткой, дальше удваивается
+    LEASE = timedelta(minutes=5)
+    # Ошибки соединения с почтовым сервером, а не конкретного письма
+    CONNECTION_ERRORS = (
+        smtplib.SMTPServerDisconnected,
+        smtplib.SMTPConnectError,
+        smtplib.SMTPAuthenticationError,
+        ConnectionError,
+        TimeoutError,
+    )
+    
+    @staticmethod
+    def pending(now=None):
+        """Уведомления, которые пора отправить"""
+        now = now or timezone.now()
+        return Notification.objects.filter(
+            deliver_by_email=True,
+            sent_via_email=False,
+            email_attempts__lt=NotificationOutbox.MAX_ATTEMPTS,
+        ).filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+    
+    @staticmethod
+    def build_message(notification):
+        return EmailMessage(
+            subject=notification.title,
+            body=notification.message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[notification.user.email],
+        )
+    
+    @staticmethod
+    def deliver_batch(connection, batch_size=BATCH_SIZE):
+        """Отправка одной пачки; возвращает (отправлено, с ошибкой)"""
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                NotificationOutbox.pending(now)
+                .select_related('user')
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            if not batch:
+                return 0, 0
+            Notification.objects.filter(pk__in=[notification.pk for notification in batch]).update(
+                next_attempt_at=now + NotificationOutbox.LEASE
+            )
+        
+        # Отправка вне транзакции: строки уже арендованы этим воркером
+        sent, failed, released = [], [], []
+        try:
+            for index, notification in enumerate(batch):
+                try:
+                    # По одному письму через общее соединение: ошибка одного
+                    # адреса не отменяет отправку остальных
+                    connection.send_messages([NotificationOutbox.build_message(notification)])
+                    sent.append(notification.pk)
+                except NotificationOutbox.CONNECTION_ERRORS:
+                    # Остальные письма через это соединение тоже не уйдут:
+                    # возвращаем их в очередь с прежним next_attempt_at
+                    released = batch[index:]
+                    raise
+                except Exception as e:
+                    notification.email_attempts += 1
+                    delay = NotificationOutbox.RETRY_DELAY * 2 ** (notification.email_attempts - 1)
+                    notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+                    notification.email_error = str(e)[:1000]
+                    failed.append(notification)
+        finally:
+            Notification.objects.filter(pk__in=sent).update(
+                sent_via_email=True,
+                emailed_at=timezone.now(),
+                email_error='',
+            )
+            Notification.objects.bulk_update(failed, ['email_attempts', 'next_attempt_at', 'email_error'])
+            Notification.objects.bulk_update(released, ['next_attempt_at'])
+        return len(sent), len(failed)
+    
+    @staticmethod
+    def deliver(batch_size=BATCH_SIZE, max_batches=None):
+        """Отправка пачками, пока очередь не опустеет; возвращает (отправлено, с ошибкой).
+        
+        При обрыве соединения исключение пробрасывается: следующий проход
+        откроет новое соединение.
+        """
+        total_sent = total_failed = 0
+        batches = 0
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        try:
+            while max_batches is None or batches < max_batches:
+                sent, failed = NotificationOutbox.deliver_batch(connection, batch_size)
+                if not sent and not failed:
+                    break
+                total_sent += sent
+                total_failed += failed
+                batches += 1
+        finally:
+            connection.close()
+        return total_sent, total_failed
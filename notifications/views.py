@@ -1,3 +1,29 @@
-from django.shortcuts import render
+from django.shortcuts import render, redirect
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from .models import Notification
 
-# Create your views here.
+@login_required
+def index(request):
+    """Последние уведомления пользователя"""
+    notifications = Notification.objects.filter(user=request.user)[:50]
+    
+    context = {
+        'notifications': notifications,
+        'title': 'Уведомления'
+    }
+    return render(request, 'notifications/index.html', context)
+
+@login_required
+@require_POST
+def mark_read(request):
+    """Пометить отмеченные уведомления прочитанными"""
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+    Notification.mark_read(request.user.pk, ids)
+    return redirect('notifications:index')
+
+@login_required
+@require_POST
+def mark_all_read(request):
+    Notification.mark_all_read(request.user.pk)
+    return redirect('notifications:index')
@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Order, OrderItem, OrderStatusHistory
+from .models import (
+    Order, OrderItem, OrderStatusHistory,
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusHistory,
+)
 from accounts.models import User
+from .utils import OrderLookup
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -26,9 +30,12 @@ class OrderStatusHistoryInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('order_number', 'user', 'status', 'total_amount', 'created_at', 'customer_phone')
+    list_display = ('order_number', 'user', 'status', 'current_stage_display', 'total_amount', 'created_at', 'customer_phone')
+    list_select_related = ('user', 'current_stage')
     list_filter = ('status', 'created_at', 'payment_method')
-    search_fields = ('order_number', 'user__email', 'customer_name', 'customer_phone', 'tracking_number')
+    # Поиск выполняет OrderLookup (см. get_search_results)
+    search_fields = ('order_number', 'customer_phone', 'customer_email')
+    search_help_text = 'Номер заказа, телефон (можно частично) или email'
     readonly_fields = ('order_number', 'created_at', 'updated_at', 'paid_at', 'calculate_total')
     list_editable = ('status',)
     inlines = [OrderItemInline, OrderStatusHistoryInline]
@@ -55,6 +62,16 @@ class OrderAdmin(admin.ModelAdmin):
         return f"{obj.calculate_total()} ₽"
     calculate_total.short_description = 'Пересчитанная сумма'
     
+    def current_stage_display(self, obj):
+        if obj.current_stage:
+            return obj.current_stage.get_status_display()
+        return '—'
+    current_stage_display.short_description = 'Этап'
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексам вместо icontains по нескольким полям"""
+        return OrderLookup.filter(queryset, search_term), False
+    
     def save_model(self, request, obj, form, change):
         if change and 'status' in form.changed_data:
             # Автоматически создаём запись в истории статусов
@@ -77,4 +94,36 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "changed_by":
             kwargs["initial"] = request.user
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
\ No newline at end of file
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    fields = ('product_name', 'quantity', 'price')
+    readonly_fields = fields
+    can_delete = False
+
+class ArchivedOrderStatusHistoryInline(admin.TabularInline):
+    model = ArchivedOrderStatusHistory
+    extra = 0
+    fields = ('status', 'stage_detail', 'comment', 'changed_at')
+    readonly_fields = fields
+    can_delete = False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Просмотр архива закрытых заказов (только чтение)"""
+    list_display = ('order_number', 'status', 'total_amount', 'created_at', 'customer_phone')
+    list_filter = ('status',)
+    search_fields = ('=order_number',)
+    date_hierarchy = 'created_at'
+    inlines = [ArchivedOrderItemInline, ArchivedOrderStatusHistoryInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,198 @@
+# orders/management/commands/archive_orders.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from orders.models import (
+    Order, OrderItem, OrderStatusHistory, OrderIdempotencyKey,
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderStatusHistory,
+)
+
+
+def month_start(value):
+    """Начало месяца (в часовом поясе проекта) для даты или смещения"""
+    value = timezone.localtime(value)
+    return timezone.make_aware(datetime(value.year, value.month, 1))
+
+
+def add_months(value, months):
+    """Сдвиг начала месяца на указанное количество месяцев"""
+    month_index = value.year * 12 + value.month - 1 + months
+    return timezone.make_aware(datetime(month_index // 12, month_index % 12 + 1, 1))
+
+
+def columns(model, *extra):
+    """Список колонок модели для INSERT ... SELECT"""
+    names = [field.column for field in model._meta.concrete_fields]
+    return [name for name in names if name not in extra]
+
+
+class Command(BaseCommand):
+    help = (
+        'Перенос закрытых заказов старше N месяцев в архивные таблицы, '
+        'создание месячных секций архива и отключение старых секций'
+    )
+    
+    # Секционированные архивные таблицы
+    ARCHIVE_TABLES = [
+        ArchivedOrder._meta.db_table,
+        ArchivedOrderItem._meta.db_table,
+        ArchivedOrderStatusHistory._meta.db_table,
+    ]
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-months', type=int, default=6,
+                            help='Архивировать закрытые заказы старше N месяцев (по умолчанию 6)')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Сколько будущих месячных секций создать заранее (по умолчанию 3)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество заказов в одной транзакции (по умолчанию 1000)')
+        parser.add_argument('--detach-before', type=str, default=None,
+                            help='Отключить секции архива до месяца ГГГГ-ММ (данные остаются '
+                                 'в отдельных таблицах для выгрузки в холодное хранилище)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, сколько заказов будет перенесено')
+    
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Архивирование поддерживается только для PostgreSQL')
+        
+        cutoff = add_months(month_start(timezone.now()), -options['older_than_months'])
+        
+        if not options['dry_run']:
+            purged = OrderIdempotencyKey.purge_expired()
+            self.stdout.write(f'Удалено просроченных ключей идемпотентности: {purged}')
+        
+        candidates = self.get_candidates(cutoff)
+        
+        if options['dry_run']:
+            self.stdout.write(f'К переносу в архив: {candidates.count()} заказов (до {cutoff:%Y-%m})')
+            return
+        
+        # Секции нужны начиная с самого старого переносимого заказа
+        oldest = candidates.aggregate(oldest=Min('created_at'))['oldest']
+        first_month = month_start(oldest) if oldest else month_start(timezone.now())
+        last_month = add_months(month_start(timezone.now()), options['months_ahead'])
+        created = self.create_partitions(first_month, last_month)
+        self.stdout.write(f'Создано секций архива: {created}')
+        
+        moved = 0
+        while True:
+            batch = list(candidates.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            self.move_batch(batch)
+            moved += len(batch)
+            self.stdout.write(f'  перенесено {moved} заказов...')
+        
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив заказов: {moved}'))
+        
+        if options['detach_before']:
+            try:
+                boundary = timezone.make_aware(datetime.strptime(options['detach_before'], '%Y-%m'))
+            except ValueError:
+                raise CommandError('Месяц для --detach-before задаётся в формате ГГГГ-ММ')
+            detached = self.detach_partitions(boundary)
+            self.stdout.write(self.style.SUCCESS(f'Отключено секций архива: {len(detached)}'))
+            for name in detached:
+                self.stdout.write(f'  {name}')
+    
+    def get_candidates(self, cutoff):
+        """Закрытые заказы старше границы, на которые нет внешних ссылок"""
+        from reviews.models import Review
+        from custom_orders.models import CustomOrderSpecification
+        
+        # Отзывы и кастомные спецификации ссылаются на рабочие таблицы,
+        # такие заказы остаются «горячими»
+        return Order.objects.filter(
+            status__in=Order.CLOSED_STATUSES,
+            created_at__lt=cutoff,
+        ).exclude(
+            Exists(Review.objects.filter(order=OuterRef('pk')))
+        ).exclude(
+            Exists(CustomOrderSpecification.objects.filter(order_item__order=OuterRef('pk')))
+        )
+    
+    def create_partitions(self, first_month, last_month):
+        """Создание месячных секций для всех архивных таблиц"""
+        created = 0
+        month = first_month
+        with connection.cursor() as cursor:
+            while month <= last_month:
+                next_month = add_months(month, 1)
+                for table in self.ARCHIVE_TABLES:
+                    partition = f'{table}_y{month:%Y}m{month:%m}'
+                    cursor.execute(
+                        "SELECT to_regclass(%s) IS NOT NULL", [partition]
+                    )
+                    if cursor.fetchone()[0]:
+                        continue
+                    cursor.execute(
+                        f'CREATE TABLE {partition} PARTITION OF {table} '
+                        f'FOR VALUES FROM (%s) TO (%s)',
+                        [month, next_month]
+                    )
+                    created += 1
+                month = next_month
+        return created
+    
+    @transaction.atomic
+    def move_batch(self, order_ids):
+        """Перенос пачки заказов с позициями и историей статусов в архив"""
+        order_table = Order._meta.db_table
+        item_table = OrderItem._meta.db_table
+        history_table = OrderStatusHistory._meta.db_table
+        key_table = OrderIdempotencyKey._meta.db_table
+        
+        order_cols = ', '.join(columns(ArchivedOrder))
+        item_cols = columns(ArchivedOrderItem, 'order_created_at')
+        history_cols = ', '.join(columns(ArchivedOrderStatusHistory))
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {ArchivedOrder._meta.db_table} ({order_cols}) '
+                f'SELECT {order_cols} FROM {order_table} WHERE id = ANY(%s)',
+                [order_ids]
+            )
+            cursor.execute(
+                f'INSERT INTO {ArchivedOrderItem._meta.db_table} ({", ".join(item_cols)}, order_created_at) '
+                f'SELECT {", ".join("i." + col for col in item_cols)}, o.created_at '
+                f'FROM {item_table} i JOIN {order_table} o ON o.id = i.order_id '
+                f'WHERE i.order_id = ANY(%s)',
+                [order_ids]
+            )
+            cursor.execute(
+                f'INSERT INTO {ArchivedOrderStatusHistory._meta.db_table} ({history_cols}) '
+                f'SELECT {history_cols} FROM {history_table} WHERE order_id = ANY(%s)',
+                [order_ids]
+            )
+            # Ключи идемпотентности старых заказов давно не нужны и в архив не переносятся
+            cursor.execute(f'DELETE FROM {key_table} WHERE order_id = ANY(%s)', [order_ids])
+            cursor.execute(f'DELETE FROM {history_table} WHERE order_id = ANY(%s)', [order_ids])
+            cursor.execute(f'DELETE FROM {item_table} WHERE order_id = ANY(%s)', [order_ids])
+            cursor.execute(f'DELETE FROM {order_table} WHERE id = ANY(%s)', [order_ids])
+    
+    def detach_partitions(self, boundary):
+        """Отключение месячных секций архива, закончившихся до границы"""
+        detached = []
+        with connection.cursor() as cursor:
+            for table in self.ARCHIVE_TABLES:
+                cursor.execute(
+                    """
+                    SELECT child.relname
+                    FROM pg_inherits
+                    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    WHERE parent.relname = %s AND child.relname ~ '_y[0-9]{4}m[0-9]{2}$'
+                    """,
+                    [table]
+                )
+                for (partition,) in cursor.fetchall():
+                    month = timezone.make_aware(datetime.strptime(partition[-7:], 'y%Ym%m'))
+                    if add_months(month, 1) <= boundary:
+                        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {partition}')
+                        detached.append(partition)
+        return detached
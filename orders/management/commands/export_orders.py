@@ -0,0 +1,58 @@
+# orders/management/commands/export_orders.py
+import sys
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.utils import OrderExporter
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка заказов с позициями за период в CSV или JSONL'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='Начало периода ГГГГ-ММ-ДД')
+        parser.add_argument('--end', required=True, help='Конец периода ГГГГ-ММ-ДД (включительно)')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv',
+                            help='Формат выгрузки (по умолчанию csv)')
+        parser.add_argument('--output', default='-',
+                            help='Файл для записи (по умолчанию stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Размер порции серверного курсора (по умолчанию 2000)')
+        parser.add_argument('--no-archive', action='store_true',
+                            help='Не включать архивные заказы')
+    
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Даты задаются в формате ГГГГ-ММ-ДД')
+        if end < start:
+            raise CommandError('Конец периода раньше начала')
+        
+        exporter = OrderExporter(
+            start, end,
+            chunk_size=options['chunk_size'],
+            include_archive=not options['no_archive'],
+        )
+        
+        output = sys.stdout if options['output'] == '-' else open(
+            options['output'], 'w', encoding='utf-8', newline=''
+        )
+        started = time.monotonic()
+        lines = 0
+        try:
+            for line in exporter.stream(options['format']):
+                output.write(line)
+                lines += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        
+        elapsed = time.monotonic() - started
+        self.stderr.write(
+            f'Выгружено строк: {lines} за {elapsed:.1f} с '
+            f'({lines / elapsed if elapsed else 0:.0f} строк/с)'
+        )
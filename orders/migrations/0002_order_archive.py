@@ -0,0 +1,120 @@
+# Generated by Django 6.0 on 2026-10-18 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Архивные таблицы повторяют структуру рабочих таблиц и секционируются по
+# месяцам. Секция DEFAULT принимает строки, для которых месячная секция ещё
+# не создана командой archive_orders.
+CREATE_ARCHIVE_TABLES = """
+CREATE TABLE orders_order_archive (
+    LIKE orders_order INCLUDING DEFAULTS,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX orders_order_archive_number_idx ON orders_order_archive (order_number);
+CREATE INDEX orders_order_archive_user_idx ON orders_order_archive (user_id);
+CREATE TABLE orders_order_archive_default PARTITION OF orders_order_archive DEFAULT;
+
+CREATE TABLE orders_orderitem_archive (
+    LIKE orders_orderitem INCLUDING DEFAULTS,
+    order_created_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, order_created_at)
+) PARTITION BY RANGE (order_created_at);
+CREATE INDEX orders_orderitem_archive_order_idx ON orders_orderitem_archive (order_id);
+CREATE TABLE orders_orderitem_archive_default PARTITION OF orders_orderitem_archive DEFAULT;
+
+CREATE TABLE orders_orderstatushistory_archive (
+    LIKE orders_orderstatushistory INCLUDING DEFAULTS,
+    PRIMARY KEY (id, changed_at)
+) PARTITION BY RANGE (changed_at);
+CREATE INDEX orders_orderstatushistory_archive_order_idx ON orders_orderstatushistory_archive (order_id);
+CREATE TABLE orders_orderstatushistory_archive_default PARTITION OF orders_orderstatushistory_archive DEFAULT;
+"""
+
+DROP_ARCHIVE_TABLES = """
+DROP TABLE IF EXISTS orders_orderstatushistory_archive;
+DROP TABLE IF EXISTS orders_orderitem_archive;
+DROP TABLE IF EXISTS orders_order_archive;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_number', models.CharField(max_length=20, verbose_name='Номер заказа')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Общая сумма')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает оплаты'), ('paid', 'Оплачен'), ('processing', 'В обработке'), ('shipped', 'Отправлен'), ('delivered', 'Доставлен'), ('cancelled', 'Отменен')], max_length=20, verbose_name='Статус')),
+                ('delivery_address', models.TextField(verbose_name='Адрес доставки')),
+                ('customer_name', models.CharField(max_length=100, verbose_name='Имя получателя')),
+                ('customer_phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('customer_email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('delivery_cost', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Стоимость доставки')),
+                ('delivery_method', models.CharField(blank=True, max_length=50, verbose_name='Способ доставки')),
+                ('tracking_number', models.CharField(blank=True, max_length=100, verbose_name='Трек-номер')),
+                ('payment_method', models.CharField(blank=True, max_length=50, verbose_name='Способ оплаты')),
+                ('payment_id', models.CharField(blank=True, max_length=100, verbose_name='ID платежа')),
+                ('paid_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата оплаты')),
+                ('discount_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма скидки')),
+                ('promo_code', models.CharField(blank=True, max_length=50, verbose_name='Промокод')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архив заказов',
+                'db_table': 'orders_order_archive',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField(verbose_name='Количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена за единицу')),
+                ('product_name', models.CharField(max_length=200, verbose_name='Название товара')),
+                ('order_created_at', models.DateTimeField(verbose_name='Дата создания заказа')),
+            ],
+            options={
+                'verbose_name': 'Архивный элемент заказа',
+                'verbose_name_plural': 'Архивные элементы заказов',
+                'db_table': 'orders_orderitem_archive',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderStatusHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('accepted', 'ПРИНЯТ'), ('agreed', 'СОГЛАСОВАН'), ('in_production', 'В РАБОТЕ'), ('preparing_for_shipment', 'ГОТОВИТСЯ К ОТПРАВКЕ'), ('shipped', 'ОТПРАВЛЕН'), ('delivered', 'ДОСТАВЛЕН'), ('cancelled', 'ОТМЕНЁН')], max_length=50, verbose_name='Статус')),
+                ('stage_detail', models.TextField(blank=True, verbose_name='Детализация этапа')),
+                ('comment', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('photo', models.ImageField(blank=True, upload_to='order_status/', verbose_name='Фотоотчёт')),
+                ('changed_at', models.DateTimeField(verbose_name='Время изменения')),
+                ('notify_customer', models.BooleanField(verbose_name='Уведомить покупателя')),
+            ],
+            options={
+                'verbose_name': 'Архивная история статуса',
+                'verbose_name_plural': 'Архивная история статусов',
+                'db_table': 'orders_orderstatushistory_archive',
+                'ordering': ['-changed_at'],
+                'managed': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='orders_orde_status_25e057_idx'),
+        ),
+        migrations.RunSQL(CREATE_ARCHIVE_TABLES, DROP_ARCHIVE_TABLES),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 11:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='order',
+            name='customer_phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=20, verbose_name='Телефон (цифры)'),
+        ),
+        migrations.RunSQL(
+            "UPDATE orders_order SET customer_phone_digits = regexp_replace(customer_phone, '\\D', '', 'g')",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_number'], name='orders_order_number_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('order_number'), name='gin_trgm_ops'), name='orders_order_number_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('customer_email'), name='gin_trgm_ops'), name='orders_order_email_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['customer_phone_digits'], name='orders_order_phone_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Указатель на последнюю запись истории для уже существующих заказов
+FILL_CURRENT_STAGE = """
+UPDATE orders_order o
+SET current_stage_id = h.id
+FROM (
+    SELECT DISTINCT ON (order_id) id, order_id
+    FROM orders_orderstatushistory
+    ORDER BY order_id, changed_at DESC, id DESC
+) h
+WHERE h.order_id = o.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='current_stage',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orders.orderstatushistory', verbose_name='Текущий этап'),
+        ),
+        migrations.AddIndex(
+            model_name='orderstatushistory',
+            index=models.Index(fields=['order', '-changed_at'], name='orders_orde_order_i_34d441_idx'),
+        ),
+        migrations.RunSQL(FILL_CURRENT_STAGE, migrations.RunSQL.noop),
+    ]
@@ -1,7 +1,24 @@
+import re
 from django.db import models
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from accounts.models import User
 from products.models import Product
 
+class OrderQuerySet(models.QuerySet):
+    def with_current_stage(self):
+        """Текущий этап производства одним JOIN без обращения к истории"""
+        return self.select_related('current_stage')
+    
+    def with_timeline(self):
+        """История этапов для всей страницы заказов одним дополнительным запросом"""
+        return self.prefetch_related(
+            models.Prefetch(
+                'status_history',
+                queryset=OrderStatusHistory.objects.order_by('changed_at', 'id'),
+            )
+        )
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Ожидает оплаты'),
@@ -22,6 +39,8 @@ class Order(models.Model):
     customer_name = models.CharField('Имя получателя', max_length=100)
     customer_phone = models.CharField('Телефон', max_length=20)
     customer_email = models.EmailField('Email')
+    # Телефон только из цифр для поиска по частичному номеру
+    customer_phone_digits = models.CharField('Телефон (цифры)', max_length=20, blank=True, editable=False)
     
     # Доставка
     delivery_cost = models.DecimalField('Стоимость доставки', max_digits=10, decimal_places=2, default=0)
@@ -40,14 +59,49 @@ class Order(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
     
+    # Последняя запись истории статусов (поддерживается OrderStatusHistory.save)
+    current_stage = models.ForeignKey('OrderStatusHistory', on_delete=models.SET_NULL, null=True,
+                                      blank=True, editable=False, related_name='+',
+                                      verbose_name='Текущий этап')
+    
+    objects = OrderQuerySet.as_manager()
+    
+    # Статусы закрытых заказов, которые можно переносить в архив
+    CLOSED_STATUSES = ['delivered', 'cancelled']
+    
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            # Поиск для поддержки: префикс номера и частичные совпадения (pg_trgm)
+            models.Index(fields=['order_number'], opclasses=['varchar_pattern_ops'],
+                         name='orders_order_number_like_idx'),
+            GinIndex(OpClass(Upper('order_number'), name='gin_trgm_ops'),
+                     name='orders_order_number_trgm_idx'),
+            GinIndex(OpClass(Upper('customer_email'), name='gin_trgm_ops'),
+                     name='orders_order_email_trgm_idx'),
+            GinIndex(fields=['customer_phone_digits'], opclasses=['gin_trgm_ops'],
+                     name='orders_order_phone_trgm_idx'),
+        ]
     
     def __str__(self):
         return f"Заказ #{self.order_number}"
     
+    @staticmethod
+    def normalize_phone(phone):
+        """Телефон без форматирования: только цифры"""
+        return re.sub(r'\D', '', phone or '')
+    
+    @classmethod
+    def find_by_number(cls, order_number):
+        """Поиск заказа по номеру: сначала в рабочей таблице, затем в архиве"""
+        order = cls.objects.filter(order_number=order_number).first()
+        if order is None:
+            order = ArchivedOrder.objects.filter(order_number=order_number).first()
+        return order
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
             # Генерация номера заказа: ГОД-МЕСЯЦ-ПОСЛЕДОВАТЕЛЬНЫЙ НОМЕР
@@ -61,6 +115,10 @@ class Order(models.Model):
             else:
                 new_num = 1
             self.order_number = f"{year_month}-{new_num:04d}"
+        self.customer_phone_digits = self.normalize_phone(self.customer_phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'customer_phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'customer_phone_digits'}
         super().save(*args, **kwargs)
     
     def calculate_total(self):
@@ -110,6 +168,187 @@ class OrderStatusHistory(models.Model):
         verbose_name = 'История статуса заказа'
         verbose_name_plural = 'История статусов заказов'
         ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['order', '-changed_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.order.order_number} - {self.get_status_display()}"
+    
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        super().save(*args, **kwargs)
+        if is_new:
+            # Переставляем указатель, если запись новее текущего этапа
+            Order.objects.filter(pk=self.order_id).filter(
+                models.Q(current_stage__isnull=True) |
+                models.Q(current_stage__changed_at__lte=self.changed_at)
+            ).update(current_stage=self)
+    
+    def delete(self, *args, **kwargs):
+        order_id = self.order_id
+        result = super().delete(*args, **kwargs)
+        self.refresh_current_stage(order_id)
+        return result
+    
+    @classmethod
+    def refresh_current_stage(cls, order_id):
+        """Пересчёт указателя на текущий этап по индексу (order, -changed_at)"""
+        latest = cls.objects.filter(order_id=order_id).order_by('-changed_at', '-id').first()
+        Order.objects.filter(pk=order_id).update(current_stage=latest)
+
+
+class OrderIdempotencyKey(models.Model):
+    """Ключ идемпотентности оформления заказа.
+    
+    Клиент передаёт один и тот же ключ при повторной отправке формы
+    (например, после таймаута), и вместо нового заказа получает исходный.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='order_idempotency_keys')
+    key = models.CharField('Ключ', max_length=64)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='idempotency_keys')
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    expires_at = models.DateTimeField('Действителен до', db_index=True)
+    
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_order_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} → {self.order_id}"
+    
+    @staticmethod
+    def cache_key(user_id, key):
+        return f"order_idempotency:{user_id}:{key}"
+    
+    @classmethod
+    def lookup(cls, user, key):
+        """Поиск заказа по ключу: сначала в кэше, затем по уникальному индексу"""
+        from django.core.cache import cache
+        from django.utils import timezone
+        
+        order_id = cache.get(cls.cache_key(user.pk, key))
+        if order_id:
+            order = Order.objects.filter(pk=order_id).first()
+            if order:
+                return order
+        
+        record = cls.objects.select_related('order').filter(
+            user=user, key=key, expires_at__gt=timezone.now(), order__isnull=False
+        ).first()
+        if record:
+            cls.remember(user.pk, key, record.order_id, record.expires_at)
+            return record.order
+        return None
+    
+    @classmethod
+    def remember(cls, user_id, key, order_id, expires_at):
+        """Сохранение соответствия ключ → заказ в кэше до истечения ключа"""
+        from django.core.cache import cache
+        from django.utils import timezone
+        
+        timeout = int((expires_at - timezone.now()).total_seconds())
+        if timeout > 0:
+            cache.set(cls.cache_key(user_id, key), order_id, timeout)
+    
+    @classmethod
+    def purge_expired(cls):
+        """Удаление просроченных ключей"""
+        from django.utils import timezone
+        
+        deleted, _ = cls.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+# ============================================================================
+# АРХИВ ЗАКРЫТЫХ ЗАКАЗОВ
+# ============================================================================
+# Архивные таблицы секционированы по месяцам (PARTITION BY RANGE) и
+# создаются миграцией через SQL, поэтому модели неуправляемые.
+# Перенос данных и создание секций выполняет команда archive_orders.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    order_number = models.CharField('Номер заказа', max_length=20)
+    total_amount = models.DecimalField('Общая сумма', max_digits=10, decimal_places=2)
+    status = models.CharField('Статус', max_length=20, choices=Order.STATUS_CHOICES)
+    
+    delivery_address = models.TextField('Адрес доставки')
+    customer_name = models.CharField('Имя получателя', max_length=100)
+    customer_phone = models.CharField('Телефон', max_length=20)
+    customer_email = models.EmailField('Email')
+    
+    delivery_cost = models.DecimalField('Стоимость доставки', max_digits=10, decimal_places=2)
+    delivery_method = models.CharField('Способ доставки', max_length=50, blank=True)
+    tracking_number = models.CharField('Трек-номер', max_length=100, blank=True)
+    
+    payment_method = models.CharField('Способ оплаты', max_length=50, blank=True)
+    payment_id = models.CharField('ID платежа', max_length=100, blank=True)
+    paid_at = models.DateTimeField('Дата оплаты', null=True, blank=True)
+    
+    discount_amount = models.DecimalField('Сумма скидки', max_digits=10, decimal_places=2)
+    promo_code = models.CharField('Промокод', max_length=50, blank=True)
+    
+    created_at = models.DateTimeField('Дата создания')
+    updated_at = models.DateTimeField('Дата обновления')
+    
+    class Meta:
+        managed = False
+        db_table = 'orders_order_archive'
+        verbose_name = 'Архивный заказ'
+        verbose_name_plural = 'Архив заказов'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Заказ #{self.order_number} (архив)"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.DO_NOTHING, db_constraint=False,
+                              related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='+')
+    quantity = models.IntegerField('Количество')
+    price = models.DecimalField('Цена за единицу', max_digits=10, decimal_places=2)
+    product_name = models.CharField('Название товара', max_length=200)
+    # Ключ секционирования: дата создания заказа
+    order_created_at = models.DateTimeField('Дата создания заказа')
+    
+    class Meta:
+        managed = False
+        db_table = 'orders_orderitem_archive'
+        verbose_name = 'Архивный элемент заказа'
+        verbose_name_plural = 'Архивные элементы заказов'
+    
+    def __str__(self):
+        return f"{self.product_name} x{self.quantity}"
+    
+    def calculate_subtotal(self):
+        return self.price * self.quantity
+
+class ArchivedOrderStatusHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.DO_NOTHING, db_constraint=False,
+                              related_name='status_history')
+    status = models.CharField('Статус', max_length=50, choices=OrderStatusHistory.STATUS_CHOICES)
+    stage_detail = models.TextField('Детализация этапа', blank=True)
+    comment = models.TextField('Комментарий', blank=True)
+    photo = models.ImageField('Фотоотчёт', upload_to='order_status/', blank=True)
+    changed_by = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                                   null=True, related_name='+')
+    changed_at = models.DateTimeField('Время изменения')
+    notify_customer = models.BooleanField('Уведомить покупателя')
+    
+    class Meta:
+        managed = False
+        db_table = 'orders_orderstatushistory_archive'
+        verbose_name = 'Архивная история статуса'
+        verbose_name_plural = 'Архивная история статусов'
+        ordering = ['-changed_at']
     
     def __str__(self):
-        return f"{self.order.order_number} - {self.get_status_display()}"
\ No newline at end of file
+        return f"{self.order_id} - {self.get_status_display()}"
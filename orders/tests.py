@@ -1,3 +1,134 @@
-from django.test import TestCase
+# orders/tests.py
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from accounts.models import User
+from cart.models import Cart, CartItem
+from products.models import Category, Product
+
+from .models import Order, OrderIdempotencyKey
+from .utils import OrderManager
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+CUSTOMER_DATA = {
+    'delivery_address': 'г. Москва, ул. Тестовая, 1',
+    'customer_name': 'Покупатель',
+    'customer_phone': '+79990000000',
+}
+
+
+class OrderFixturesMixin:
+    """Покупатель, мастер и товар для оформления заказов"""
+    
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user('buyer@example.com', 'password', email_confirmed=True)
+        self.master = User.objects.create_user(
+            'master@example.com', 'password', role='master', email_confirmed=True
+        )
+        category = Category.objects.create(name='Керамика')
+        self.product = Product.objects.create(
+            name='Кружка', master=self.master, category=category,
+            price=100, stock_quantity=10, status='active',
+        )
+    
+    def make_cart(self, quantity=1):
+        cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=quantity, price=self.product.price)
+        return cart
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class IdempotentOrderTest(OrderFixturesMixin, TestCase):
+    """Повторная отправка формы оформления с тем же ключом"""
+    
+    def test_sequential_duplicate_returns_original_order(self):
+        first = OrderManager.create_from_cart(self.make_cart(), CUSTOMER_DATA, 'key-1')
+        second = OrderManager.create_from_cart(self.make_cart(), CUSTOMER_DATA, 'key-1')
+        
+        self.assertTrue(first['success'])
+        self.assertFalse(first['duplicate'])
+        self.assertTrue(second['success'])
+        self.assertTrue(second['duplicate'])
+        self.assertEqual(second['order'].pk, first['order'].pk)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderIdempotencyKey.objects.count(), 1)
+    
+    def test_integrity_error_falls_back_to_lookup(self):
+        first = OrderManager.create_from_cart(self.make_cart(), CUSTOMER_DATA, 'key-1')
+        cache.clear()
+        
+        # Параллельный запрос зафиксировал ключ между первичной проверкой и вставкой
+        real_lookup = OrderIdempotencyKey.lookup
+        calls = []
+        
+        def lookup(user, key):
+            calls.append(key)
+            return None if len(calls) == 1 else real_lookup(user, key)
+        
+        with mock.patch.object(OrderIdempotencyKey, 'lookup', side_effect=lookup):
+            second = OrderManager.create_from_cart(self.make_cart(), CUSTOMER_DATA, 'key-1')
+        
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(second['success'])
+        self.assertTrue(second['duplicate'])
+        self.assertEqual(second['order'].pk, first['order'].pk)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderIdempotencyKey.objects.count(), 1)
+    
+    def test_expired_key_creates_new_order(self):
+        first = OrderManager.create_from_cart(self.make_cart(), CUSTOMER_DATA, 'key-1')
+        OrderIdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        cache.clear()
+        
+        second = OrderManager.create_from_cart(self.make_cart(), CUSTOMER_DATA, 'key-1')
+        
+        self.assertTrue(second['success'])
+        self.assertFalse(second['duplicate'])
+        self.assertNotEqual(second['order'].pk, first['order'].pk)
+        self.assertEqual(Order.objects.count(), 2)
+        record = OrderIdempotencyKey.objects.get()
+        self.assertEqual(record.order_id, second['order'].pk)
+        self.assertGreater(record.expires_at, timezone.now())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentIdempotentOrderTest(OrderFixturesMixin, TransactionTestCase):
+    """Две одновременные отправки формы с одним ключом"""
+    
+    def test_concurrent_duplicate_creates_one_order(self):
+        # У каждого запроса своя корзина: очистка корзины первым запросом
+        # не должна влиять на исход второго
+        carts = [self.make_cart(), self.make_cart()]
+        barrier = threading.Barrier(len(carts))
+        results, errors = [], []
+        
+        def submit(cart):
+            try:
+                barrier.wait()
+                results.append(OrderManager.create_from_cart(cart, CUSTOMER_DATA, 'key-1'))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=submit, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderIdempotencyKey.objects.count(), 1)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual({result['order'].pk for result in results}, {Order.objects.get().pk})
+        self.assertEqual(sorted(result['duplicate'] for result in results), [False, True])
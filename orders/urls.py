@@ -5,4 +5,6 @@ app_name = 'orders'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('checkout/', views.checkout, name='checkout'),
+    path('export/', views.export_orders, name='export'),
 ]
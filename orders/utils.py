@@ -0,0 +1,256 @@
+# orders/utils.py
+import csv
+import json
+import re
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Order, OrderItem, OrderStatusHistory, OrderIdempotencyKey, ArchivedOrderItem,
+)
+
+
+class OrderManager:
+    """Класс для оформления заказов"""
+    
+    @staticmethod
+    def create_from_cart(cart, customer_data, idempotency_key=None):
+        """Оформление заказа из корзины.
+        
+        Если передан ключ идемпотентности и заказ с таким ключом уже создан,
+        возвращается исходный заказ без повторной транзакции.
+        """
+        user = cart.user
+        
+        if idempotency_key:
+            order = OrderIdempotencyKey.lookup(user, idempotency_key)
+            if order:
+                return {'success': True, 'order': order, 'duplicate': True}
+        
+        items = list(cart.items.select_related('product'))
+        if not items:
+            return {'success': False, 'error': 'Корзина пуста'}
+        
+        from cart.utils import CartValidator
+        validation = CartValidator.validate(
+            [{'product': item.product, 'quantity': item.quantity} for item in items]
+        )
+        if not validation['valid']:
+            return {
+                'success': False,
+                'error': 'Некоторые товары недоступны',
+                'problems': validation['problems'],
+            }
+        
+        try:
+            with transaction.atomic():
+                record = None
+                if idempotency_key:
+                    # Просроченный ключ можно использовать повторно
+                    OrderIdempotencyKey.objects.filter(
+                        user=user, key=idempotency_key, expires_at__lte=timezone.now()
+                    ).delete()
+                    # Уникальный индекс блокирует параллельный запрос с тем же
+                    # ключом до завершения этой транзакции
+                    record = OrderIdempotencyKey.objects.create(
+                        user=user,
+                        key=idempotency_key,
+                        expires_at=timezone.now() + timedelta(seconds=settings.ORDER_IDEMPOTENCY_TTL),
+                    )
+                
+                order = OrderManager._create_order(user, items, customer_data)
+                cart.clear()
+                
+                if record:
+                    record.order = order
+                    record.save(update_fields=['order'])
+                    transaction.on_commit(lambda: OrderIdempotencyKey.remember(
+                        user.pk, idempotency_key, order.pk, record.expires_at
+                    ))
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            # Параллельный запрос с тем же ключом успел создать заказ
+            order = OrderIdempotencyKey.lookup(user, idempotency_key)
+            if order is None:
+                raise
+            return {'success': True, 'order': order, 'duplicate': True}
+        
+        return {'success': True, 'order': order, 'duplicate': False}
+    
+    @staticmethod
+    def _create_order(user, cart_items, customer_data):
+        """Создание заказа с позициями и первой записью истории статусов"""
+        delivery_cost = customer_data.get('delivery_cost', 0)
+        discount_amount = customer_data.get('discount_amount', 0)
+        items_total = sum(item.calculate_subtotal() for item in cart_items)
+        
+        order = Order.objects.create(
+            user=user,
+            total_amount=items_total + delivery_cost - discount_amount,
+            delivery_address=customer_data.get('delivery_address') or user.get_full_address(),
+            customer_name=customer_data.get('customer_name') or user.get_full_name() or user.email,
+            customer_phone=customer_data.get('customer_phone') or user.phone,
+            customer_email=customer_data.get('customer_email') or user.email,
+            delivery_cost=delivery_cost,
+            delivery_method=customer_data.get('delivery_method', ''),
+            payment_method=customer_data.get('payment_method', ''),
+            discount_amount=discount_amount,
+            promo_code=customer_data.get('promo_code', ''),
+        )
+        
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                price=item.product.price,
+                product_name=item.product.name,
+            )
+            for item in cart_items
+        ])
+        
+        # Рейтинги товаров обновляются после фиксации, чтобы не держать блокировки строк
+        from analytics.utils import ProductRankingManager
+        lines = [(item.product_id, item.product.category_id, item.quantity) for item in cart_items]
+        transaction.on_commit(lambda: ProductRankingManager.record_sales(lines))
+        
+        OrderStatusHistory.objects.create(
+            order=order,
+            status='accepted',
+            changed_by=user,
+            comment='Заказ оформлен',
+            notify_customer=False,
+        )
+        
+        return order
+
+
+class _EchoBuffer:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+    
+    def write(self, value):
+        return value
+
+
+class OrderExporter:
+    """Потоковая выгрузка заказов с позициями для бухгалтерии.
+    
+    Строки читаются серверным курсором порциями по chunk_size, поэтому
+    потребление памяти не зависит от размера периода.
+    """
+    
+    # (заголовок колонки, поле относительно позиции заказа)
+    COLUMNS = [
+        ('order_number', 'order__order_number'),
+        ('created_at', 'order__created_at'),
+        ('status', 'order__status'),
+        ('customer_name', 'order__customer_name'),
+        ('customer_email', 'order__customer_email'),
+        ('total_amount', 'order__total_amount'),
+        ('delivery_cost', 'order__delivery_cost'),
+        ('discount_amount', 'order__discount_amount'),
+        ('payment_method', 'order__payment_method'),
+        ('paid_at', 'order__paid_at'),
+        ('product_id', 'product_id'),
+        ('product_name', 'product_name'),
+        ('quantity', 'quantity'),
+        ('price', 'price'),
+    ]
+    HEADER = [name for name, _ in COLUMNS] + ['subtotal']
+    
+    def __init__(self, start_date, end_date, chunk_size=2000, include_archive=True):
+        """Период задаётся датами включительно"""
+        self.start = timezone.make_aware(datetime.combine(start_date, time.min))
+        self.end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+        self.chunk_size = chunk_size
+        self.include_archive = include_archive
+    
+    def rows(self):
+        """Строки выгрузки: рабочие заказы, затем архивные"""
+        lookups = [lookup for _, lookup in self.COLUMNS]
+        
+        querysets = [
+            OrderItem.objects.filter(
+                order__created_at__gte=self.start, order__created_at__lt=self.end
+            ).order_by('order_id', 'id').values_list(*lookups)
+        ]
+        if self.include_archive:
+            # Фильтр по ключу секционирования затрагивает только нужные месяцы
+            querysets.append(
+                ArchivedOrderItem.objects.filter(
+                    order_created_at__gte=self.start, order_created_at__lt=self.end
+                ).order_by('order_id', 'id').values_list(*lookups)
+            )
+        
+        for queryset in querysets:
+            for row in queryset.iterator(chunk_size=self.chunk_size):
+                quantity, price = row[-2], row[-1]
+                yield row + (price * quantity,)
+    
+    def iter_csv(self):
+        writer = csv.writer(_EchoBuffer())
+        yield writer.writerow(self.HEADER)
+        for row in self.rows():
+            yield writer.writerow(row)
+    
+    def iter_jsonl(self):
+        for row in self.rows():
+            yield json.dumps(dict(zip(self.HEADER, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+    
+    def stream(self, export_format='csv'):
+        if export_format == 'jsonl':
+            return self.iter_jsonl()
+        return self.iter_csv()
+
+
+class OrderLookup:
+    """Поиск заказов для службы поддержки по номеру, телефону и email.
+    
+    Каждое условие обслуживается своим индексом: префиксным B-tree по номеру
+    и триграммными GIN-индексами (pg_trgm) для частичных совпадений.
+    """
+    
+    # Триграммный индекс помогает только для подстрок от 3 символов
+    MIN_PARTIAL_LENGTH = 3
+    PHONE_PATTERN = re.compile(r'^[\d\s()+\-]+$')
+    
+    @staticmethod
+    def build_filter(query):
+        """Условие поиска по строке запроса или None для пустого запроса"""
+        query = (query or '').strip()
+        if not query:
+            return None
+        
+        if len(query) < OrderLookup.MIN_PARTIAL_LENGTH:
+            return Q(order_number__startswith=query)
+        
+        condition = Q(order_number__icontains=query)
+        if '@' in query or not OrderLookup.PHONE_PATTERN.match(query):
+            condition |= Q(customer_email__icontains=query)
+        
+        digits = Order.normalize_phone(query)
+        if len(digits) >= OrderLookup.MIN_PARTIAL_LENGTH and OrderLookup.PHONE_PATTERN.match(query):
+            condition |= Q(customer_phone_digits__contains=digits)
+        return condition
+    
+    @staticmethod
+    def filter(queryset, query):
+        condition = OrderLookup.build_filter(query)
+        if condition is None:
+            return queryset
+        return queryset.filter(condition)
+    
+    @staticmethod
+    def search(query, limit=50):
+        """Поиск заказов: точное совпадение номера проверяется первым"""
+        exact = Order.objects.filter(order_number=(query or '').strip()).select_related('user')
+        if exact:
+            return list(exact)
+        queryset = OrderLookup.filter(Order.objects.select_related('user'), query)
+        return list(queryset.order_by('-created_at')[:limit])
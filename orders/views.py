@@ -1,4 +1,86 @@
+from datetime import datetime
 from django.shortcuts import render
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseBadRequest
+from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
+from cart.models import Cart
+from analytics.events import track
+from .models import Order
+from .utils import OrderManager, OrderExporter
 
+@login_required
 def index(request):
-    return render(request, 'orders/index.html')
+    """Заказы покупателя с текущим этапом и историей этапов"""
+    orders = Order.objects.filter(user=request.user).with_current_stage().order_by('-created_at')
+    
+    paginator = Paginator(orders, 10)
+    page = paginator.get_page(request.GET.get('page'))
+    
+    # История этапов подгружается одним запросом для всей страницы
+    page.object_list = list(page.object_list.with_timeline())
+    
+    return render(request, 'orders/order_list.html', {
+        'orders': page,
+        'title': 'Мои заказы',
+    })
+
+@login_required
+@require_POST
+def checkout(request):
+    """Оформление заказа из корзины.
+    
+    Клиент может передать заголовок Idempotency-Key (или поле idempotency_key):
+    повторная отправка с тем же ключом вернёт уже созданный заказ.
+    """
+    idempotency_key = (
+        request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key') or ''
+    ).strip()[:64] or None
+    
+    customer_data = {
+        field: request.POST.get(field, '')
+        for field in ('delivery_address', 'customer_name', 'customer_phone', 'customer_email',
+                      'delivery_method', 'payment_method', 'promo_code')
+    }
+    
+    cart = Cart.get_for_user(request.user)
+    result = OrderManager.create_from_cart(cart, customer_data, idempotency_key)
+    
+    if not result['success']:
+        return JsonResponse({
+            'success': False,
+            'error': result['error'],
+            'problems': result.get('problems', {}),
+        }, status=400)
+    
+    order = result['order']
+    if not result['duplicate']:
+        track('checkout', request)
+    return JsonResponse({
+        'success': True,
+        'order_number': order.order_number,
+        'total_amount': str(order.total_amount),
+        'duplicate': result['duplicate'],
+    }, status=200 if result['duplicate'] else 201)
+
+@staff_member_required
+def export_orders(request):
+    """Потоковая выгрузка заказов за период для бухгалтерии (только для персонала)"""
+    try:
+        start = datetime.strptime(request.GET.get('start', ''), '%Y-%m-%d').date()
+        end = datetime.strptime(request.GET.get('end', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return HttpResponseBadRequest('Укажите start и end в формате ГГГГ-ММ-ДД')
+    
+    export_format = 'jsonl' if request.GET.get('format') == 'jsonl' else 'csv'
+    content_type = 'application/x-ndjson' if export_format == 'jsonl' else 'text/csv'
+    
+    exporter = OrderExporter(start, end)
+    response = StreamingHttpResponse(
+        exporter.stream(export_format), content_type=f'{content_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="orders_{start:%Y%m%d}_{end:%Y%m%d}.{export_format}"'
+    )
+    return response
@@ -1,6 +1,7 @@
 # products/models.py - ПРАВИЛЬНЫЙ ВАРИАНТ
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
 from accounts.models import User
 from django.utils import timezone
 
@@ -19,6 +20,18 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def with_rating(self):
+        """Средняя оценка и число одобренных отзывов из сводки reviews.ProductRating.
+        
+        Одно LEFT JOIN вместо AVG/COUNT по отзывам для каждой карточки;
+        товары без отзывов получают 0.
+        """
+        return self.annotate(
+            rating_average=Coalesce(F('rating_summary__average'), Value(0.0)),
+            rating_count=Coalesce(F('rating_summary__count'), Value(0)),
+        )
+
 class Product(models.Model):
     STATUS_CHOICES = [
         ('active', 'Активен'),
@@ -74,6 +87,8 @@ class Product(models.Model):
     base_cost = models.DecimalField('Базовая стоимость материалов', max_digits=10, 
                                    decimal_places=2, default=0)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
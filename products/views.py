@@ -4,11 +4,13 @@ from django.db.models import Q
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from .models import Product, Category
 from materials.models import Material
+from analytics.events import track
+from analytics.utils import ProductRankingManager
 
 def product_list(request):
     """Список товаров с поиском и фильтрацией"""
     # Получаем все активные товары
-    products = Product.objects.filter(status='active').order_by('-created_at')
+    products = Product.objects.filter(status='active').with_rating().order_by('-created_at')
     
     # Поиск по названию и описанию
     search_query = request.GET.get('search', '')
@@ -17,6 +19,7 @@ def product_list(request):
             Q(name__icontains=search_query) | 
             Q(description__icontains=search_query)
         )
+        track('search', request, query=search_query)
     
     # Фильтр по категории
     category_id = request.GET.get('category')
@@ -62,11 +65,17 @@ def product_list(request):
         technique__isnull=True
     ).exclude(technique='').values_list('technique', flat=True).distinct()
     
+    # Бестселлеры категории (или всего каталога) — из кэша рейтингов
+    bestsellers = []
+    if products_page.number == 1 and not search_query:
+        bestsellers = ProductRankingManager.top('bestsellers', category_id=category_id, limit=4)
+    
     context = {
         'products': products_page,
         'categories': categories,
         'techniques': techniques,
         'search_query': search_query,
+        'bestsellers': bestsellers,
     }
     
     return render(request, 'products/product_list.html', context)
@@ -74,6 +83,7 @@ def product_list(request):
 def product_detail(request, product_id):
     """Детальная страница товара"""
     product = get_object_or_404(Product, id=product_id, status='active')
+    track('product_view', request, product_id=product.id)
     
     # Получаем похожие товары
     similar_products = Product.objects.filter(
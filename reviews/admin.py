@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from .models import Review, ReviewImage
+from .utils import ReviewModeration
 from accounts.models import User
 
 class ReviewImageInline(admin.TabularInline):
@@ -17,8 +18,10 @@ class ReviewImageInline(admin.TabularInline):
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
-    list_display = ('product', 'user', 'rating_stars', 'title', 'purchase_verified', 'is_approved', 'created_at')
-    list_filter = ('rating', 'purchase_verified', 'is_approved', 'created_at', 'product__category')
+    list_display = ('product', 'user', 'rating_stars', 'title', 'purchase_verified', 'is_approved',
+                    'duplicate_group', 'created_at')
+    list_filter = ('rating', 'purchase_verified', 'is_approved', ('duplicate_group', admin.EmptyFieldListFilter),
+                   'created_at', 'product__category')
     search_fields = ('product__name', 'user__email', 'title', 'text')
     list_editable = ('is_approved', 'purchase_verified')
     readonly_fields = ('created_at', 'updated_at', 'rating_stars', 'verified_purchase_button')
@@ -30,7 +33,8 @@ class ReviewAdmin(admin.ModelAdmin):
             'fields': ('title', 'text')
         }),
         ('Проверка и модерация', {
-            'fields': ('purchase_verified', 'verified_purchase_button', 'is_approved', 'moderated_by', 'moderation_notes')
+            'fields': ('purchase_verified', 'verified_purchase_button', 'is_approved', 'moderated_by', 'moderation_notes',
+                       'duplicate_group')
         }),
         ('Даты', {
             'fields': ('created_at', 'updated_at'),
@@ -39,6 +43,26 @@ class ReviewAdmin(admin.ModelAdmin):
     )
     
     inlines = [ReviewImageInline]
+    list_select_related = ('product', 'user')
+    actions = ['verify_purchases', 'approve_reviews', 'reject_reviews']
+    
+    def verify_purchases(self, request, queryset):
+        """Подтвердить покупку для выбранных отзывов одним запросом"""
+        updated = ReviewModeration.verify_purchases(queryset)
+        verified = queryset.filter(purchase_verified=True).count()
+        self.message_user(request, f'Проверено отзывов: {updated}, покупка подтверждена: {verified}.', messages.SUCCESS)
+    verify_purchases.short_description = "Проверить факт покупки"
+    
+    def approve_reviews(self, request, queryset):
+        updated = ReviewModeration.set_approved(queryset, True, moderator=request.user)
+        self.message_user(request, f'Одобрено отзывов: {updated}.', messages.SUCCESS)
+    approve_reviews.short_description = "Одобрить выбранные отзывы"
+    
+    def reject_reviews(self, request, queryset):
+        updated = ReviewModeration.set_approved(queryset, False, moderator=request.user)
+        self.message_user(request, f'Отклонено отзывов: {updated}.', messages.SUCCESS)
+    reject_reviews.short_description = "Отклонить выбранные отзывы"
+    
     
     def rating_stars(self, obj):
         stars = '★' * obj.rating + '☆' * (5 - obj.rating)
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ReviewsConfig(AppConfig):
     name = 'reviews'
-    verbose_name = 'Отзывы'
\ No newline at end of file
+    verbose_name = 'Отзывы'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,39 @@
+# reviews/management/commands/index_reviews.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.utils import DuplicateDetector
+
+
+class Command(BaseCommand):
+    help = (
+        'Индексация новых и изменённых отзывов (MinHash) с поиском почти-дубликатов; '
+        'запускается по расписанию, например раз в минуту'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Переиндексировать все отзывы, а не только новые')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Отзывов в одной пачке (по умолчанию 500)')
+        parser.add_argument('--flag', action='store_true',
+                            help='Пересчитать группы почти-дубликатов для модераторов')
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        indexed, flagged = DuplicateDetector.index_all(
+            rebuild=options['rebuild'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f'Проиндексировано отзывов: {indexed}, похожих на уже известные: {flagged} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+        
+        if options['flag']:
+            clusters = DuplicateDetector.flag_clusters()
+            flagged = sum(len(members) for members in clusters.values())
+            self.stdout.write(self.style.SUCCESS(
+                f'Найдено групп: {len(clusters)}, отзывов в них: {flagged}'
+            ))
@@ -0,0 +1,26 @@
+# reviews/management/commands/recompute_master_ratings.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.utils import MasterRatingEngine
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт рейтингов мастеров по одобренным отзывам (по умолчанию — только затронутых)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать всех мастеров, а не только изменившихся')
+        parser.add_argument('--no-smoothing', action='store_true',
+                            help='Простое среднее без байесовского сглаживания')
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed = MasterRatingEngine.run(
+            full=options['full'],
+            smoothing=not options['no_smoothing'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рейтингов: {changed} за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,21 @@
+# reviews/management/commands/recompute_product_ratings.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.models import ProductRating
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт сводок рейтингов товаров по одобренным отзывам'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='products',
+                            help='Пересчитать только указанный товар (можно повторять)')
+    
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = ProductRating.recompute(options['products'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано сводок: {count} за {time.monotonic() - started:.1f} с'
+        ))
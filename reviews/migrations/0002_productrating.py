@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-18 22:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_base_cost_product_can_be_customized_and_more'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRating',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='products.product')),
+                ('average', models.FloatField(default=0, verbose_name='Средняя оценка')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество отзывов')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('stars_1', models.IntegerField(default=0, verbose_name='1 звезда')),
+                ('stars_2', models.IntegerField(default=0, verbose_name='2 звезды')),
+                ('stars_3', models.IntegerField(default=0, verbose_name='3 звезды')),
+                ('stars_4', models.IntegerField(default=0, verbose_name='4 звезды')),
+                ('stars_5', models.IntegerField(default=0, verbose_name='5 звёзд')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг товара по отзывам',
+                'verbose_name_plural': 'Рейтинги товаров по отзывам',
+            },
+        ),
+        # Сводки по уже одобренным отзывам
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO reviews_productrating
+                    (product_id, average, count, rating_sum,
+                     stars_1, stars_2, stars_3, stars_4, stars_5, updated_at)
+                SELECT product_id, AVG(rating), COUNT(*), SUM(rating),
+                       COUNT(*) FILTER (WHERE rating = 1),
+                       COUNT(*) FILTER (WHERE rating = 2),
+                       COUNT(*) FILTER (WHERE rating = 3),
+                       COUNT(*) FILTER (WHERE rating = 4),
+                       COUNT(*) FILTER (WHERE rating = 5),
+                       NOW()
+                FROM reviews_review
+                WHERE is_approved
+                GROUP BY product_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
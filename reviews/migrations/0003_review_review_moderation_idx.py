@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_productrating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['is_approved', 'created_at', 'id'], name='review_moderation_idx'),
+        ),
+    ]
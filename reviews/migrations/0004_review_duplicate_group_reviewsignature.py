@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 23:05
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_review_moderation_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='duplicate_group',
+            field=models.PositiveIntegerField(blank=True, db_index=True, help_text='Номер первого отзыва в группе почти одинаковых текстов', null=True, verbose_name='Группа похожих отзывов'),
+        ),
+        migrations.CreateModel(
+            name='ReviewSignature',
+            fields=[
+                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='reviews.review')),
+                ('minhash', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None, verbose_name='Сигнатура')),
+                ('bands', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None, verbose_name='Ключи корзин')),
+                ('indexed_at', models.DateTimeField(auto_now=True, verbose_name='Дата индексации')),
+            ],
+            options={
+                'verbose_name': 'Сигнатура отзыва',
+                'verbose_name_plural': 'Сигнатуры отзывов',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['bands'], name='review_signature_bands_gin')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_review_review_product_feed_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['updated_at', 'product'], name='review_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# reviews/minhash.py
+import hashlib
+import random
+import re
+
+
+def _permutations(count, prime, seed):
+    """Коэффициенты (a, b) хеш-функций вида (a·x + b) mod prime"""
+    rng = random.Random(seed)
+    return [(rng.randrange(1, prime), rng.randrange(0, prime)) for _ in range(count)]
+
+
+class MinHash:
+    """Сигнатура MinHash текста и ключи LSH-корзин для поиска почти-дубликатов.
+    
+    Текст нормализуется и режется на символьные шинглы по SHINGLE символов.
+    Сигнатура — NUM_PERM минимумов хешей шинглов; доля совпавших позиций двух
+    сигнатур оценивает коэффициент Жаккара их множеств шинглов.
+    Сигнатура делится на BANDS полос по ROWS значений, каждая полоса хешируется
+    в ключ корзины. Тексты, совпавшие хотя бы в одной полосе, — кандидаты:
+    при схожести 0.8 такая пара находится с вероятностью ≈ 99.9%, при 0.3 —
+    примерно в 12% случаев, и кандидаты дополнительно проверяются по сигнатуре.
+    """
+    
+    SHINGLE = 5
+    NUM_PERM = 64
+    BANDS = 16
+    ROWS = NUM_PERM // BANDS
+    THRESHOLD = 0.8
+    
+    _PRIME = (1 << 61) - 1
+    _MAX = (1 << 31) - 1  # значения сигнатуры помещаются в integer Postgres
+    
+    # Фиксированное зерно: сигнатуры, посчитанные в разных процессах, сравнимы
+    _PERMUTATIONS = _permutations(NUM_PERM, _PRIME, seed=20240601)
+    
+    _WORDS = re.compile(r'\w+')
+    
+    @classmethod
+    def shingles(cls, text):
+        """Хеши символьных шинглов нормализованного текста"""
+        normalized = ' '.join(cls._WORDS.findall(text.lower()))
+        if not normalized:
+            return set()
+        if len(normalized) <= cls.SHINGLE:
+            pieces = {normalized}
+        else:
+            pieces = {normalized[i:i + cls.SHINGLE] for i in range(len(normalized) - cls.SHINGLE + 1)}
+        return {
+            int.from_bytes(hashlib.blake2b(piece.encode(), digest_size=8).digest(), 'big')
+            for piece in pieces
+        }
+    
+    @classmethod
+    def signature(cls, text):
+        """Список NUM_PERM целых или None для текста без слов"""
+        shingles = cls.shingles(text)
+        if not shingles:
+            return None
+        prime, mask = cls._PRIME, cls._MAX
+        return [
+            min((a * x + b) % prime for x in shingles) & mask
+            for a, b in cls._PERMUTATIONS
+        ]
+    
+    @classmethod
+    def bands(cls, signature):
+        """Ключи корзин LSH: номер полосы входит в хеш, поэтому ключи разных полос не пересекаются"""
+        keys = []
+        for band in range(cls.BANDS):
+            rows = signature[band * cls.ROWS:(band + 1) * cls.ROWS]
+            payload = ','.join(map(str, [band, *rows])).encode()
+            digest = hashlib.blake2b(payload, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'big', signed=True))
+        return keys
+    
+    @staticmethod
+    def similarity(first, second):
+        """Оценка коэффициента Жаккара по двум сигнатурам"""
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
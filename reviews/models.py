@@ -1,4 +1,9 @@
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
 from accounts.models import User
 from products.models import Product
 from orders.models import Order
@@ -29,6 +34,9 @@ class Review(models.Model):
     moderated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, 
                                     blank=True, related_name='moderated_reviews')
     moderation_notes = models.TextField('Заметки модератора', blank=True)
+    duplicate_group = models.PositiveIntegerField('Группа похожих отзывов', null=True, blank=True,
+                                                  db_index=True,
+                                                  help_text='Номер первого отзыва в группе почти одинаковых текстов')
     
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
@@ -38,6 +46,15 @@ class Review(models.Model):
         verbose_name_plural = 'Отзывы'
         ordering = ['-created_at']
         unique_together = ['product', 'user']  # Один отзыв на товар от пользователя
+        indexes = [
+            # Очередь модерации: нерассмотренные отзывы по дате создания
+            models.Index(fields=['is_approved', 'created_at', 'id'], name='review_moderation_idx'),
+            # Лента отзывов товара: новые первыми и по оценке
+            models.Index(fields=['product', 'is_approved', 'created_at'], name='review_product_feed_idx'),
+            models.Index(fields=['product', 'is_approved', 'rating'], name='review_product_rating_idx'),
+            # Инкрементальный пересчёт рейтингов мастеров: отзывы, изменённые после отметки
+            models.Index(fields=['updated_at', 'product'], name='review_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Отзыв на {self.product.name} от {self.user.email}"
@@ -48,7 +65,7 @@ class Review(models.Model):
             # Проверяем, что товар есть в заказе
             order_items = self.order.items.filter(product=self.product)
             self.purchase_verified = order_items.exists()
-            self.save()
+            self.save(update_fields=['purchase_verified', 'updated_at'])
             return self.purchase_verified
         return False
 
@@ -62,4 +79,113 @@ class ReviewImage(models.Model):
         verbose_name_plural = 'Изображения отзывов'
     
     def __str__(self):
-        return f"Изображение к отзыву #{self.review.id}"
\ No newline at end of file
+        return f"Изображение к отзыву #{self.review.id}"
+
+class ReviewSignature(models.Model):
+    """MinHash-сигнатура текста отзыва и ключи LSH-корзин (см. reviews/minhash.py)"""
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='signature')
+    minhash = ArrayField(models.IntegerField(), verbose_name='Сигнатура')
+    bands = ArrayField(models.BigIntegerField(), verbose_name='Ключи корзин')
+    indexed_at = models.DateTimeField('Дата индексации', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Сигнатура отзыва'
+        verbose_name_plural = 'Сигнатуры отзывов'
+        indexes = [
+            # Поиск кандидатов: bands && ARRAY[...]
+            GinIndex(fields=['bands'], name='review_signature_bands_gin'),
+        ]
+    
+    def __str__(self):
+        return f"Сигнатура отзыва #{self.review_id}"
+
+class ProductRating(models.Model):
+    """Сводка одобренных отзывов о товаре: средняя оценка, количество и гистограмма 1–5"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='rating_summary')
+    average = models.FloatField('Средняя оценка', default=0)
+    count = models.IntegerField('Количество отзывов', default=0)
+    rating_sum = models.IntegerField('Сумма оценок', default=0)
+    stars_1 = models.IntegerField('1 звезда', default=0)
+    stars_2 = models.IntegerField('2 звезды', default=0)
+    stars_3 = models.IntegerField('3 звезды', default=0)
+    stars_4 = models.IntegerField('4 звезды', default=0)
+    stars_5 = models.IntegerField('5 звёзд', default=0)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Рейтинг товара по отзывам'
+        verbose_name_plural = 'Рейтинги товаров по отзывам'
+    
+    def __str__(self):
+        return f"{self.product.name}: {self.average:.2f} ({self.count})"
+    
+    def histogram(self):
+        """[(оценка, количество, доля в %)] от 5 до 1"""
+        return [
+            (stars, getattr(self, f'stars_{stars}'),
+             getattr(self, f'stars_{stars}') * 100 / self.count if self.count else 0)
+            for stars in range(5, 0, -1)
+        ]
+    
+    @classmethod
+    def apply(cls, product_id, rating, delta):
+        """Добавление (delta=1) или вычитание (delta=-1) одной одобренной оценки"""
+        with transaction.atomic():
+            if delta > 0:
+                cls.objects.get_or_create(product_id=product_id)
+            rows = cls.objects.filter(product_id=product_id)
+            rows.update(**{
+                'updated_at': timezone.now(),
+                'count': F('count') + delta,
+                'rating_sum': F('rating_sum') + delta * rating,
+                f'stars_{rating}': F(f'stars_{rating}') + delta,
+            })
+            # Среднее по уже обновлённым значениям — отдельным UPDATE
+            rows.update(average=Case(
+                When(count__lte=0, then=Value(0.0)),
+                default=Cast('rating_sum', FloatField()) / F('count'),
+            ))
+    
+    @classmethod
+    def recompute(cls, product_ids=None):
+        """Полный пересчёт сводок одним сгруппированным запросом (по всем или указанным товарам)"""
+        reviews = Review.objects.filter(is_approved=True)
+        if product_ids is not None:
+            reviews = reviews.filter(product_id__in=product_ids)
+        
+        rows = (
+            reviews.values('product_id')
+            .annotate(
+                total=Count('id'),
+                avg=Avg('rating'),
+                **{f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)}
+            )
+            .order_by()
+        )
+        summaries = {
+            row['product_id']: cls(
+                product_id=row['product_id'],
+                average=row['avg'] or 0,
+                count=row['total'],
+                rating_sum=sum(stars * row[f'stars_{stars}'] for stars in range(1, 6)),
+                **{f'stars_{stars}': row[f'stars_{stars}'] for stars in range(1, 6)}
+            )
+            for row in rows
+        }
+        
+        with transaction.atomic():
+            stale = cls.objects.exclude(product_id__in=list(summaries))
+            if product_ids is not None:
+                stale = stale.filter(product_id__in=product_ids)
+            stale.delete()
+            cls.objects.bulk_create(
+                summaries.values(),
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['average', 'count', 'rating_sum', 'stars_1', 'stars_2', 'stars_3',
+                               'stars_4', 'stars_5', 'updated_at'],
+            )
+        return len(summaries)
@@ -0,0 +1,65 @@
+# reviews/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ProductRating, Review, ReviewImage, ReviewSignature
+from .utils import ProductReviewFeed
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Запоминаем, как отзыв учитывался в рейтинге до сохранения"""
+    instance._rating_before = None
+    if instance.pk:
+        instance._rating_before = Review.objects.filter(pk=instance.pk).values(
+            'product_id', 'rating', 'is_approved', 'text'
+        ).first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, **kwargs):
+    """Одобрение, снятие одобрения или правка оценки меняют сводку товара"""
+    before = getattr(instance, '_rating_before', None)
+    old = (before['product_id'], before['rating']) if before and before['is_approved'] else None
+    new = (instance.product_id, instance.rating) if instance.is_approved else None
+    if old == new:
+        return
+    if old:
+        ProductRating.apply(*old, delta=-1)
+    if new:
+        ProductRating.apply(*new, delta=1)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    if instance.is_approved:
+        ProductRating.apply(instance.product_id, instance.rating, delta=-1)
+
+
+@receiver(post_save, sender=Review)
+def index_review_text(sender, instance, created, **kwargs):
+    """Устаревшая сигнатура изменённого текста удаляется; новую посчитает index_reviews"""
+    before = getattr(instance, '_rating_before', None)
+    if not created and before and before['text'] != instance.text:
+        ReviewSignature.objects.filter(review_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_feed(sender, instance, **kwargs):
+    """Одобренный отзыв (сейчас или до сохранения) виден в кешированной ленте товара"""
+    before = getattr(instance, '_rating_before', None)
+    product_ids = {instance.product_id}
+    if before:
+        product_ids.add(before['product_id'])
+    if instance.is_approved or (before and before['is_approved']):
+        transaction.on_commit(lambda: ProductReviewFeed.invalidate(product_ids))
+
+
+@receiver(post_save, sender=ReviewImage)
+@receiver(post_delete, sender=ReviewImage)
+def invalidate_review_feed_on_image(sender, instance, **kwargs):
+    product_id = Review.objects.filter(pk=instance.review_id).values_list('product_id', flat=True).first()
+    if product_id:
+        transaction.on_commit(lambda: ProductReviewFeed.invalidate([product_id]))
@@ -3,4 +3,8 @@ from . import views
 
 app_name = 'reviews'
 
-urlpatterns = []
+urlpatterns = [
+    path('product/<int:product_id>/', views.product_reviews, name='product_reviews'),
+    path('moderation/', views.moderation_queue, name='moderation_queue'),
+    path('moderation/action/', views.moderate, name='moderate'),
+]
@@ -0,0 +1,429 @@
+# reviews/utils.py
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from accounts.models import User
+from products.models import Product
+from .minhash import MinHash
+from .models import ProductRating, Review, ReviewImage, ReviewSignature
+
+
+class MasterRatingEngine:
+    """Пересчёт User.master_rating по одобренным отзывам на товары мастера.
+    
+    Рейтинг сглаживается по Байесу: (C·m + сумма оценок) / (C + число отзывов),
+    где m — средняя оценка по всему магазину, C — вес априорного среднего.
+    Мастер с одним отзывом «5» не обгоняет мастера с сотней отзывов 4.8.
+    """
+    
+    WATERMARK = 'master_ratings'
+    PRIOR_WEIGHT = 5
+    
+    @staticmethod
+    def affected_masters(since):
+        """Мастера, у товаров которых менялись отзывы или сводки рейтинга после отметки"""
+        from_reviews = Review.objects.filter(updated_at__gt=since).values_list(
+            'product__master_id', flat=True
+        )
+        from_summaries = ProductRating.objects.filter(updated_at__gt=since).values_list(
+            'product__master_id', flat=True
+        )
+        return set(from_reviews) | set(from_summaries)
+    
+    @staticmethod
+    def run(full=False, smoothing=True):
+        """Пересчёт рейтингов (всех мастеров или затронутых с прошлого запуска)"""
+        from analytics.models import ProcessingWatermark
+        
+        started_at = timezone.now()
+        since = None if full else ProcessingWatermark.get_value(MasterRatingEngine.WATERMARK)
+        master_ids = None if since is None else MasterRatingEngine.affected_masters(since)
+        
+        changed = MasterRatingEngine.recompute(master_ids, smoothing=smoothing)
+        ProcessingWatermark.set_value(MasterRatingEngine.WATERMARK, started_at)
+        return changed
+    
+    @staticmethod
+    def recompute(master_ids=None, smoothing=True):
+        """Пересчёт рейтингов указанных мастеров (None — всех); возвращает число изменённых"""
+        masters = User.objects.filter(role='master')
+        if master_ids is not None:
+            masters = masters.filter(pk__in=master_ids)
+        
+        approved = Review.objects.filter(is_approved=True)
+        prior = approved.aggregate(mean=Avg('rating'))['mean'] or 0
+        
+        # Один сгруппированный запрос по отзывам на товары выбранных мастеров
+        stats = {
+            row['product__master']: (row['total'], row['rating_sum'])
+            for row in approved.filter(product__master__in=masters)
+            .values('product__master')
+            .annotate(total=Count('id'), rating_sum=Sum('rating'))
+            .order_by()
+        }
+        
+        weight = MasterRatingEngine.PRIOR_WEIGHT if smoothing else 0
+        changed = []
+        for master in masters.only('pk', 'master_rating'):
+            count, rating_sum = stats.get(master.pk, (0, 0))
+            if count:
+                value = (weight * prior + rating_sum) / (weight + count)
+            else:
+                value = 0
+            value = Decimal(str(value)).quantize(Decimal('0.01'))
+            if value != master.master_rating:
+                master.master_rating = value
+                changed.append(master)
+        
+        User.objects.bulk_update(changed, ['master_rating'], batch_size=500)
+        return len(changed)
+
+
+class ReviewModeration:
+    """Очередь модерации отзывов и пакетные операции над выборкой.
+    
+    Все операции выполняются одним UPDATE на выборку; сводки рейтинга
+    товаров и рейтинги мастеров пересчитываются один раз на пачку.
+    """
+    
+    PAGE_SIZE = 50
+    
+    @staticmethod
+    def pending(after=None, limit=PAGE_SIZE):
+        """Страница ещё не рассмотренных отзывов (старые первыми) с курсором на следующую.
+        
+        after — курсор вида 'created_at.isoformat()|id' из предыдущей страницы.
+        Пагинация по ключу (created_at, id) не зависит от глубины, в отличие от OFFSET.
+        """
+        reviews = (
+            Review.objects.filter(is_approved=False, moderated_by__isnull=True)
+            .select_related('user', 'product', 'order')
+            .order_by('created_at', 'id')
+        )
+        if after:
+            created_at, pk = ReviewModeration.parse_cursor(after)
+            reviews = reviews.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            )
+        
+        page = list(reviews[:limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            next_cursor = f'{last.created_at.isoformat()}|{last.id}'
+        return page, next_cursor
+    
+    @staticmethod
+    def parse_cursor(cursor):
+        created_at, _, pk = cursor.rpartition('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    
+    @staticmethod
+    def verify_purchases(queryset):
+        """Подтверждение покупки для всей выборки одним UPDATE с подзапросом EXISTS"""
+        from orders.models import OrderItem
+        
+        bought = OrderItem.objects.filter(order=OuterRef('order'), product=OuterRef('product'))
+        return Review.objects.filter(pk__in=queryset.values('pk'), order__isnull=False).update(
+            purchase_verified=Exists(bought),
+            updated_at=timezone.now(),
+        )
+    
+    @staticmethod
+    def set_approved(queryset, approved, moderator=None, notes=None):
+        """Одобрение или отклонение выборки с пересчётом рейтингов один раз на пачку"""
+        with transaction.atomic():
+            reviews = Review.objects.filter(pk__in=queryset.values('pk'))
+            # Рейтинги затрагивают только отзывы, у которых статус действительно меняется
+            product_ids = set(
+                reviews.exclude(is_approved=approved).values_list('product_id', flat=True)
+            )
+            fields = {
+                'is_approved': approved,
+                'moderated_by': moderator,
+                'updated_at': timezone.now(),
+            }
+            if notes is not None:
+                fields['moderation_notes'] = notes
+            updated = reviews.update(**fields)
+            
+            if product_ids:
+                # UPDATE не вызывает сигналы — сводки и кеш ленты пересчитываем явно
+                ProductRating.recompute(product_ids)
+                transaction.on_commit(lambda: ProductReviewFeed.invalidate(product_ids))
+                master_ids = Product.objects.filter(pk__in=product_ids).values_list('master_id', flat=True)
+                MasterRatingEngine.recompute(set(master_ids))
+        return updated
+
+
+class DuplicateDetector:
+    """Поиск почти одинаковых отзывов (копипаст-спама) по MinHash-сигнатурам.
+    
+    Кандидаты ищутся одним запросом по GIN-индексу ключей корзин и проверяются
+    по сигнатуре, так что новый отзыв не сравнивается со всеми существующими.
+    Найденные отзывы объединяются в группу duplicate_group для модераторов.
+    Сигнатуры считаются не в запросе посетителя, а командой index_reviews
+    по расписанию: она индексирует новые и изменённые отзывы.
+    """
+    
+    @staticmethod
+    def similar(signature, exclude_id=None, threshold=MinHash.THRESHOLD):
+        """[(id отзыва, схожесть)] по убыванию схожести"""
+        candidates = ReviewSignature.objects.filter(bands__overlap=MinHash.bands(signature))
+        if exclude_id is not None:
+            candidates = candidates.exclude(review_id=exclude_id)
+        
+        matches = []
+        for review_id, minhash in candidates.values_list('review_id', 'minhash'):
+            score = MinHash.similarity(signature, minhash)
+            if score >= threshold:
+                matches.append((review_id, score))
+        return sorted(matches, key=lambda match: -match[1])
+    
+    @staticmethod
+    def find(text, exclude_id=None):
+        """Почти-дубликаты произвольного текста (например, отзыва до сохранения)"""
+        signature = MinHash.signature(text)
+        if signature is None:
+            return []
+        return DuplicateDetector.similar(signature, exclude_id=exclude_id)
+    
+    @staticmethod
+    def index(review):
+        """Индексация одного отзыва; возвращает найденные почти-дубликаты"""
+        signature = MinHash.signature(review.text)
+        if signature is None:
+            ReviewSignature.objects.filter(review_id=review.pk).delete()
+            return []
+        
+        matches = DuplicateDetector.similar(signature, exclude_id=review.pk)
+        ReviewSignature.objects.update_or_create(
+            review_id=review.pk,
+            defaults={'minhash': signature, 'bands': MinHash.bands(signature)},
+        )
+        if matches:
+            DuplicateDetector.group([review.pk, *(review_id for review_id, _ in matches)])
+        return matches
+    
+    @staticmethod
+    def group(review_ids):
+        """Объединение отзывов (и уже известных групп, куда они входят) в одну группу"""
+        groups = set(
+            Review.objects.filter(pk__in=review_ids, duplicate_group__isnull=False)
+            .values_list('duplicate_group', flat=True)
+        )
+        # Номер группы — наименьший id среди участников
+        number = min([*review_ids, *groups])
+        Review.objects.filter(Q(pk__in=review_ids) | Q(duplicate_group__in=groups)).update(
+            duplicate_group=number
+        )
+        return number
+    
+    @staticmethod
+    def index_all(rebuild=False, batch_size=500):
+        """Пакетная индексация отзывов (по умолчанию — только ещё не проиндексированных).
+        
+        Для новых отзывов сразу ищутся почти-дубликаты среди уже проиндексированных.
+        При полной переиндексации группы пересчитывает flag_clusters.
+        Возвращает (проиндексировано, попало в группы).
+        """
+        reviews = Review.objects.order_by('pk')
+        if not rebuild:
+            reviews = reviews.filter(signature__isnull=True)
+        
+        indexed = flagged = 0
+        last_id = 0
+        while True:
+            batch = list(reviews.filter(pk__gt=last_id).values_list('pk', 'text')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            
+            signatures = []
+            for review_id, text in batch:
+                signature = MinHash.signature(text)
+                if signature is not None:
+                    signatures.append(ReviewSignature(
+                        review_id=review_id, minhash=signature, bands=MinHash.bands(signature),
+                    ))
+            ReviewSignature.objects.bulk_create(
+                signatures,
+                update_conflicts=True,
+                unique_fields=['review'],
+                update_fields=['minhash', 'bands', 'indexed_at'],
+            )
+            indexed += len(signatures)
+            
+            if not rebuild:
+                for item in signatures:
+                    matches = DuplicateDetector.similar(item.minhash, exclude_id=item.review_id)
+                    if matches:
+                        DuplicateDetector.group([item.review_id, *(review_id for review_id, _ in matches)])
+                        flagged += 1
+        return indexed, flagged
+    
+    @staticmethod
+    def flag_clusters(threshold=MinHash.THRESHOLD):
+        """Пересчёт групп почти-дубликатов по всему индексу; возвращает {номер группы: [id]}"""
+        # Пары кандидатов — отзывы с общим ключом хотя бы одной корзины
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                WITH buckets AS (
+                    SELECT review_id, unnest(bands) AS bucket
+                    FROM reviews_reviewsignature
+                )
+                SELECT DISTINCT a.review_id, b.review_id
+                FROM buckets a
+                JOIN buckets b ON b.bucket = a.bucket AND b.review_id > a.review_id
+            """)
+            pairs = cursor.fetchall()
+        
+        ids = {review_id for pair in pairs for review_id in pair}
+        signatures = dict(
+            ReviewSignature.objects.filter(review_id__in=ids).values_list('review_id', 'minhash')
+        )
+        
+        # Система непересекающихся множеств по подтверждённым парам
+        parent = {}
+        
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
+        for first, second in pairs:
+            if MinHash.similarity(signatures[first], signatures[second]) >= threshold:
+                root_first, root_second = find(first), find(second)
+                if root_first != root_second:
+                    parent[max(root_first, root_second)] = min(root_first, root_second)
+        
+        clusters = {}
+        for review_id in parent:
+            clusters.setdefault(find(review_id), []).append(review_id)
+        
+        with transaction.atomic():
+            Review.objects.filter(duplicate_group__isnull=False).update(duplicate_group=None)
+            for number, members in clusters.items():
+                Review.objects.filter(pk__in=members).update(duplicate_group=number)
+        return clusters
+
+
+class ProductReviewFeed:
+    """Лента одобренных отзывов товара с пагинацией по ключу.
+    
+    Для каждой сортировки курсор — значения полей сортировки последнего отзыва
+    страницы, так что дальние страницы стоят столько же, сколько первая.
+    Первая страница каждой сортировки кешируется по товару и сбрасывается
+    при модерации, правке и удалении отзывов.
+    """
+    
+    PAGE_SIZE = 10
+    CACHE_TIMEOUT = 60 * 60
+    
+    # Поля сортировки: (имя поля, по убыванию); id замыкает порядок
+    SORTS = {
+        'newest': [('created_at', True), ('id', True)],
+        'highest': [('rating', True), ('created_at', True), ('id', True)],
+        'lowest': [('rating', False), ('created_at', True), ('id', True)],
+    }
+    
+    @staticmethod
+    def cache_key(product_id, sort, with_photos):
+        return f"reviews:feed:{product_id}:{sort}:{int(with_photos)}"
+    
+    @staticmethod
+    def invalidate(product_ids):
+        cache.delete_many([
+            ProductReviewFeed.cache_key(product_id, sort, with_photos)
+            for product_id in product_ids
+            for sort in ProductReviewFeed.SORTS
+            for with_photos in (False, True)
+        ])
+    
+    @staticmethod
+    def page(product_id, sort='newest', with_photos=False, after=None):
+        """{'reviews': [...], 'next_cursor': str | None}; первая страница — из кеша"""
+        if sort not in ProductReviewFeed.SORTS:
+            sort = 'newest'
+        if after:
+            return ProductReviewFeed.build(product_id, sort, with_photos, after)
+        
+        key = ProductReviewFeed.cache_key(product_id, sort, with_photos)
+        data = cache.get(key)
+        if data is None:
+            data = ProductReviewFeed.build(product_id, sort, with_photos)
+            cache.set(key, data, ProductReviewFeed.CACHE_TIMEOUT)
+        return data
+    
+    @staticmethod
+    def build(product_id, sort, with_photos, after=None):
+        fields = ProductReviewFeed.SORTS[sort]
+        reviews = (
+            Review.objects.filter(product_id=product_id, is_approved=True)
+            .select_related('user')
+            .prefetch_related('images')
+            .order_by(*(f'-{name}' if desc else name for name, desc in fields))
+        )
+        if with_photos:
+            reviews = reviews.filter(Exists(ReviewImage.objects.filter(review=OuterRef('pk'))))
+        if after:
+            reviews = reviews.filter(ProductReviewFeed.after(fields, after))
+        
+        page = list(reviews[:ProductReviewFeed.PAGE_SIZE + 1])
+        next_cursor = None
+        if len(page) > ProductReviewFeed.PAGE_SIZE:
+            page = page[:ProductReviewFeed.PAGE_SIZE]
+            next_cursor = ProductReviewFeed.cursor(fields, page[-1])
+        
+        return {
+            'reviews': [ProductReviewFeed.serialize(review) for review in page],
+            'next_cursor': next_cursor,
+        }
+    
+    @staticmethod
+    def cursor(fields, review):
+        values = []
+        for name, _ in fields:
+            value = getattr(review, name)
+            values.append(value.isoformat() if name == 'created_at' else str(value))
+        return '|'.join(values)
+    
+    @staticmethod
+    def after(fields, cursor):
+        """Условие «строго после курсора» для составного порядка сортировки"""
+        raw = cursor.split('|')
+        if len(raw) != len(fields):
+            raise ValueError('Некорректный курсор')
+        values = [
+            datetime.fromisoformat(value) if name == 'created_at' else int(value)
+            for (name, _), value in zip(fields, raw)
+        ]
+        
+        # (a, b, c) после (x, y, z): a за x, или a = x и b за y, или ...
+        condition = Q()
+        equal = {}
+        for (name, desc), value in zip(fields, values):
+            condition |= Q(**equal, **{f"{name}__{'lt' if desc else 'gt'}": value})
+            equal[name] = value
+        return condition
+    
+    @staticmethod
+    def serialize(review):
+        return {
+            'id': review.id,
+            'rating': review.rating,
+            'title': review.title,
+            'text': review.text,
+            'author': review.user.first_name or 'Покупатель',
+            'purchase_verified': review.purchase_verified,
+            'created_at': review.created_at.isoformat(),
+            'images': [image.image.url for image in review.images.all()],
+        }
@@ -1,4 +1,84 @@
-from django.shortcuts import render
+from urllib.parse import urlencode
+from django.http import JsonResponse
+from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
+from .models import Review
+from .utils import ProductReviewFeed, ReviewModeration
 
 def index(request):
-    return render(request, 'reviews/index.html')
\ No newline at end of file
+    return render(request, 'reviews/index.html')
+
+def product_reviews(request, product_id):
+    """Одобренные отзывы о товаре в JSON: ?sort=newest|highest|lowest, ?photos=1, ?after=<курсор>"""
+    try:
+        data = ProductReviewFeed.page(
+            product_id,
+            sort=request.GET.get('sort', 'newest'),
+            with_photos=request.GET.get('photos') == '1',
+            after=request.GET.get('after') or None,
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный курсор'}, status=400)
+    return JsonResponse(data)
+
+@staff_member_required
+def moderation_queue(request):
+    """Очередь отзывов на модерацию (постранично по курсору)"""
+    after = request.GET.get('after', '')
+    try:
+        reviews, next_cursor = ReviewModeration.pending(after=after or None)
+    except ValueError:
+        return redirect('reviews:moderation_queue')
+    
+    # Остальные отзывы тех же групп почти-дубликатов — одним запросом на страницу
+    groups = {review.duplicate_group for review in reviews if review.duplicate_group}
+    members = {}
+    for review_id, group in Review.objects.filter(duplicate_group__in=groups).values_list('id', 'duplicate_group'):
+        members.setdefault(group, []).append(review_id)
+    for review in reviews:
+        review.similar_ids = [
+            review_id for review_id in members.get(review.duplicate_group, []) if review_id != review.id
+        ]
+    
+    context = {
+        'title': 'Модерация отзывов',
+        'reviews': reviews,
+        'next_cursor': next_cursor,
+        'is_first_page': not after,
+    }
+    return render(request, 'reviews/moderation_queue.html', context)
+
+@staff_member_required
+@require_POST
+def moderate(request):
+    """Пакетное действие над отмеченными отзывами"""
+    action = request.POST.get('action')
+    ids = [pk for pk in request.POST.getlist('review_ids') if pk.isdigit()]
+    selected = Review.objects.filter(pk__in=ids)
+    
+    if not ids:
+        messages.error(request, 'Не выбрано ни одного отзыва')
+    elif action == 'verify':
+        updated = ReviewModeration.verify_purchases(selected)
+        messages.success(request, f'Проверено отзывов: {updated}')
+    elif action == 'approve':
+        updated = ReviewModeration.set_approved(selected, True, moderator=request.user)
+        messages.success(request, f'Одобрено отзывов: {updated}')
+    elif action == 'reject':
+        updated = ReviewModeration.set_approved(
+            selected, False, moderator=request.user,
+            notes=request.POST.get('notes') or None,
+        )
+        messages.success(request, f'Отклонено отзывов: {updated}')
+    else:
+        messages.error(request, 'Неизвестное действие')
+    
+    # Остаёмся на той же странице очереди: рассмотренные отзывы из неё уже ушли
+    url = reverse('reviews:moderation_queue')
+    after = request.POST.get('after')
+    if after:
+        url += '?' + urlencode({'after': after})
+    return redirect(url)